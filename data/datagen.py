@@ -1,12 +1,19 @@
+import copy
+import functools
+import io
+import multiprocessing
 import os
-import random
 import datetime
 import uuid
+import warnings
+from collections import defaultdict, namedtuple
+
+import numpy as np
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
@@ -17,121 +24,150 @@ from reportlab.pdfbase.ttfonts import TTFont
 
 HAS_JAPANESE_FONT = False
 JAPANESE_FONT = "Helvetica"  # Fallback, will not render Japanese properly
+_fonts_ready = False
+
+
+def _ensure_fonts():
+    """Registers the first available Japanese font (once per process).
+
+    Parsing the TTF is deferred until a PDF is actually built, so importing
+    this module for its vendor / FX tables stays cheap. Font-dependent
+    styles and lookups are updated in place once the font is known.
+    """
+    global HAS_JAPANESE_FONT, JAPANESE_FONT, _fonts_ready
+    if _fonts_ready:
+        return
+    _fonts_ready = True
+
+    # Try a couple of common Noto Japanese fonts
+    for font_name, font_path in [
+        ("NotoSansJP", "NotoSansJP-VariableFont_wght.ttf"),
+        ("NotoSansCJKjp", "fonts/NotoSansCJKjp-Regular.ttf"),
+    ]:
+        if not os.path.isfile(font_path):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(font_name, font_path))
+            JAPANESE_FONT = font_name
+            HAS_JAPANESE_FONT = True
+            break
+        except Exception:
+            continue
+
+    if not HAS_JAPANESE_FONT:
+        warnings.warn(
+            "Japanese font not found. "
+            "Place NotoSansJP-Regular.ttf in the working folder "
+            "or fonts/NotoSansCJKjp-Regular.ttf in a 'fonts' directory "
+            "for proper Japanese rendering.",
+            stacklevel=2,
+        )
+        return
 
-# Try a couple of common Noto Japanese fonts
-for font_name, font_path in [
-    ("NotoSansJP", "NotoSansJP-VariableFont_wght.ttf"),
-    ("NotoSansCJKjp", "fonts/NotoSansCJKjp-Regular.ttf"),
-]:
-    try:
-        pdfmetrics.registerFont(TTFont(font_name, font_path))
-        JAPANESE_FONT = font_name
-        HAS_JAPANESE_FONT = True
-        break
-    except Exception:
-        continue
-
-if not HAS_JAPANESE_FONT:
-    print(
-        "Warning: Japanese font not found. "
-        "Place NotoSansJP-Regular.ttf in the working folder "
-        "or fonts/NotoSansCJKjp-Regular.ttf in a 'fonts' directory "
-        "for proper Japanese rendering."
-    )
+    jp_style.fontName = JAPANESE_FONT
+    HEADER_BOLD_FONT_BY_COUNTRY["Japan"] = JAPANESE_FONT
+    HEADER_REG_FONT_BY_COUNTRY["Japan"] = JAPANESE_FONT
 
 # ============================================================
 # CONFIGURATION
 # ============================================================
 
 NUM_TRANSACTIONS = 30
+NUM_WORKERS = os.cpu_count() or 1  # Processes used to render transaction sets
 OUTPUT_DIR = "simulated_data_lake"
 CHAOS_RATE = 0.5  # 5% of invoices will have issues
+CHAOS_TYPES = ("PRICE_HIKE", "GHOST_PO", "CURRENCY_ERROR")
+
+# Catalog records: immutable, with attribute access in the hot path
+Vendor = namedtuple('Vendor', 'name country currency address header_title tagline items')
+Buyer = namedtuple('Buyer', 'name country currency')
+CatalogItem = namedtuple('CatalogItem', 'desc price_range currency sku', defaults=("",))
 
 # Mock Data: Global Vendors
 VENDORS = [
-    {
-        "name": "TechFlow Systems",
-        "country": "USA",
-        "currency": "USD",
-        "address": "123 Silicon Blvd, San Jose, CA 95134",
-        "header_title": "Invoice",
-        "tagline": "High Performance Compute Solutions",
-        "items": [
-            {"sku": "TF-SRV-4U", "desc": "Server Rack Mount 4U", "price_range": (250, 550), "currency": "USD"},
-            {"sku": "TF-SSD-100TB", "desc": "100TB SSD Storage Unit", "price_range": (900, 1300), "currency": "USD"},
-            {"sku": "TF-FOC-100M", "desc": "Fiber Optic Cable (100m)", "price_range": (60, 160), "currency": "USD"},
-        ],
-    },
-    {
-        "name": "Nordic Chipsets AB",
-        "country": "Sweden",
-        "currency": "SEK",
-        "address": "Fjordgatan 99, 116 45 Stockholm",
-        "header_title": "Faktura",
-        "tagline": "Precision Silicon from the Nordics",
-        "items": [
-            {"sku": "NC-SSD-100TB", "desc": "100TB SSD Storage Unit", "price_range": (9500, 12500), "currency": "SEK"},
-            {"sku": "NC-FOC-100M", "desc": "Fiber Optic Cable (100m)", "price_range": (600, 1400), "currency": "SEK"},
-            {"sku": "NC-SW-48P", "desc": "Enterprise Switch 48-Port", "price_range": (17000, 26000), "currency": "SEK"},
-        ],
-    },
-    {
-        "name": "Nippon Logic Ltd - 日本",
-        "country": "Japan",
-        "currency": "JPY",
-        "address": "4-2-8 Shibakoen, Minato City, Tokyo",
-        "header_title": "請求書",
-        "tagline": "ハイパフォーマンス半導体ソリューション",
-        "items": [
-            {"sku": "NL-SRV-4U", "desc": "Server Rack Mount 4U", "price_range": (28000, 52000), "currency": "JPY"},
-            {"sku": "NL-FOC-100M", "desc": "Fiber Optic Cable (100m)", "price_range": (5500, 14500), "currency": "JPY"},
-            {"sku": "NL-FAN-MOD", "desc": "Cooling Fan Module", "price_range": (9000, 19000), "currency": "JPY"},
-        ],
-    },
-    {
-        "name": "Berlin Hardware GmbH",
-        "country": "Germany",
-        "currency": "EUR",
-        "address": "Alexanderplatz 1, 10178 Berlin",
-        "header_title": "Rechnung",
-        "tagline": "Infrastruktur & Netzwerktechnik",
-        "items": [
-            {"sku": "BH-SRV-4U", "desc": "Server Rack Mount 4U", "price_range": (230, 520), "currency": "EUR"},
-            {"sku": "BH-SSD-100TB", "desc": "100TB SSD Storage Unit", "price_range": (850, 1250), "currency": "EUR"},
-            {"sku": "BH-SW-48P", "desc": "Enterprise Switch 48-Port", "price_range": (1600, 2600), "currency": "EUR"},
-        ],
-    },
-    {
-        "name": "Mumbai Micro Devices",
-        "country": "India",
-        "currency": "INR",
-        "address": "Unit 402, Andheri East, Mumbai 400069",
-        "header_title": "TAX INVOICE",
-        "tagline": "Semiconductor & Datacenter Components",
-        "items": [
-            {"sku": "MM-FOC-100M", "desc": "Fiber Optic Cable (100m)", "price_range": (4200, 9800), "currency": "INR"},
-            {"sku": "MM-FAN-MOD", "desc": "Cooling Fan Module", "price_range": (8200, 16500), "currency": "INR"},
-            {"sku": "MM-SW-48P", "desc": "Enterprise Switch 48-Port", "price_range": (120000, 210000), "currency": "INR"},
-        ],
-    },
+    Vendor(
+        name="TechFlow Systems",
+        country="USA",
+        currency="USD",
+        address="123 Silicon Blvd, San Jose, CA 95134",
+        header_title="Invoice",
+        tagline="High Performance Compute Solutions",
+        items=(
+            CatalogItem(sku="TF-SRV-4U", desc="Server Rack Mount 4U", price_range=(250, 550), currency="USD"),
+            CatalogItem(sku="TF-SSD-100TB", desc="100TB SSD Storage Unit", price_range=(900, 1300), currency="USD"),
+            CatalogItem(sku="TF-FOC-100M", desc="Fiber Optic Cable (100m)", price_range=(60, 160), currency="USD"),
+        ),
+    ),
+    Vendor(
+        name="Nordic Chipsets AB",
+        country="Sweden",
+        currency="SEK",
+        address="Fjordgatan 99, 116 45 Stockholm",
+        header_title="Faktura",
+        tagline="Precision Silicon from the Nordics",
+        items=(
+            CatalogItem(sku="NC-SSD-100TB", desc="100TB SSD Storage Unit", price_range=(9500, 12500), currency="SEK"),
+            CatalogItem(sku="NC-FOC-100M", desc="Fiber Optic Cable (100m)", price_range=(600, 1400), currency="SEK"),
+            CatalogItem(sku="NC-SW-48P", desc="Enterprise Switch 48-Port", price_range=(17000, 26000), currency="SEK"),
+        ),
+    ),
+    Vendor(
+        name="Nippon Logic Ltd - 日本",
+        country="Japan",
+        currency="JPY",
+        address="4-2-8 Shibakoen, Minato City, Tokyo",
+        header_title="請求書",
+        tagline="ハイパフォーマンス半導体ソリューション",
+        items=(
+            CatalogItem(sku="NL-SRV-4U", desc="Server Rack Mount 4U", price_range=(28000, 52000), currency="JPY"),
+            CatalogItem(sku="NL-FOC-100M", desc="Fiber Optic Cable (100m)", price_range=(5500, 14500), currency="JPY"),
+            CatalogItem(sku="NL-FAN-MOD", desc="Cooling Fan Module", price_range=(9000, 19000), currency="JPY"),
+        ),
+    ),
+    Vendor(
+        name="Berlin Hardware GmbH",
+        country="Germany",
+        currency="EUR",
+        address="Alexanderplatz 1, 10178 Berlin",
+        header_title="Rechnung",
+        tagline="Infrastruktur & Netzwerktechnik",
+        items=(
+            CatalogItem(sku="BH-SRV-4U", desc="Server Rack Mount 4U", price_range=(230, 520), currency="EUR"),
+            CatalogItem(sku="BH-SSD-100TB", desc="100TB SSD Storage Unit", price_range=(850, 1250), currency="EUR"),
+            CatalogItem(sku="BH-SW-48P", desc="Enterprise Switch 48-Port", price_range=(1600, 2600), currency="EUR"),
+        ),
+    ),
+    Vendor(
+        name="Mumbai Micro Devices",
+        country="India",
+        currency="INR",
+        address="Unit 402, Andheri East, Mumbai 400069",
+        header_title="TAX INVOICE",
+        tagline="Semiconductor & Datacenter Components",
+        items=(
+            CatalogItem(sku="MM-FOC-100M", desc="Fiber Optic Cable (100m)", price_range=(4200, 9800), currency="INR"),
+            CatalogItem(sku="MM-FAN-MOD", desc="Cooling Fan Module", price_range=(8200, 16500), currency="INR"),
+            CatalogItem(sku="MM-SW-48P", desc="Enterprise Switch 48-Port", price_range=(120000, 210000), currency="INR"),
+        ),
+    ),
 ]
 
 # Mock Data: Buying Companies (buyers can be in different countries)
 BUYERS = [
-    {"name": "Global Tech Corp", "country": "USA", "currency": "USD"},
-    {"name": "Global Tech Europe GmbH", "country": "Germany", "currency": "EUR"},
-    {"name": "Global Tech India Pvt Ltd", "country": "India", "currency": "INR"},
-    {"name": "Global Tech Nordics AB", "country": "Sweden", "currency": "SEK"},
-    {"name": "Global Tech Japan KK", "country": "Japan", "currency": "JPY"},
+    Buyer(name="Global Tech Corp", country="USA", currency="USD"),
+    Buyer(name="Global Tech Europe GmbH", country="Germany", currency="EUR"),
+    Buyer(name="Global Tech India Pvt Ltd", country="India", currency="INR"),
+    Buyer(name="Global Tech Nordics AB", country="Sweden", currency="SEK"),
+    Buyer(name="Global Tech Japan KK", country="Japan", currency="JPY"),
 ]
 
 # Mock Data: Items (generic, mostly unused now because we use vendor catalogs)
 ITEMS = [
-    {"desc": "Server Rack Mount 4U", "price_range": (200, 500), "currency": "USD"},
-    {"desc": "100TB SSD Storage Unit", "price_range": (800, 1200), "currency": "USD"},
-    {"desc": "Fiber Optic Cable (100m)", "price_range": (50, 150), "currency": "USD"},
-    {"desc": "Cooling Fan Module", "price_range": (100, 200), "currency": "USD"},
-    {"desc": "Enterprise Switch 48-Port", "price_range": (1500, 2500), "currency": "USD"},
+    CatalogItem(desc="Server Rack Mount 4U", price_range=(200, 500), currency="USD"),
+    CatalogItem(desc="100TB SSD Storage Unit", price_range=(800, 1200), currency="USD"),
+    CatalogItem(desc="Fiber Optic Cable (100m)", price_range=(50, 150), currency="USD"),
+    CatalogItem(desc="Cooling Fan Module", price_range=(100, 200), currency="USD"),
+    CatalogItem(desc="Enterprise Switch 48-Port", price_range=(1500, 2500), currency="USD"),
 ]
 
 # Tax configuration per vendor country (used primarily for invoices)
@@ -157,8 +193,52 @@ FX_RATES_TO_HOME = {
     "INR": 0.012,
 }
 
-# Ensure output directories exist
-os.makedirs(f"{OUTPUT_DIR}/incoming", exist_ok=True)
+# Cross rates for every (from, to) pair of known currencies, via the home currency
+FX_CROSS_RATES = {
+    (src, dst): src_rate / dst_rate
+    for src, src_rate in FX_RATES_TO_HOME.items()
+    for dst, dst_rate in FX_RATES_TO_HOME.items()
+}
+
+
+def get_fx_rate(src_currency, dst_currency):
+    """Rate that converts `src_currency` amounts into `dst_currency`."""
+    rate = FX_CROSS_RATES.get((src_currency, dst_currency))
+    if rate is None:
+        src_to_home = FX_RATES_TO_HOME.get(src_currency, 1.0)
+        dst_to_home = FX_RATES_TO_HOME.get(dst_currency, 1.0)
+        rate = src_to_home / dst_to_home if dst_to_home else 1.0
+    return rate
+
+# Per-vendor arrays for bulk line-item generation; catalogs are padded to
+# the largest one and price bounds are inclusive
+MAX_CATALOG_ITEMS = max(len(v.items) for v in VENDORS)
+CATALOG_SIZES = np.array([len(v.items) for v in VENDORS])
+CATALOG_PRICE_LO = np.array([
+    [item.price_range[0] for item in v.items] + [0] * (MAX_CATALOG_ITEMS - len(v.items))
+    for v in VENDORS
+])
+CATALOG_PRICE_HI = np.array([
+    [item.price_range[1] for item in v.items] + [0] * (MAX_CATALOG_ITEMS - len(v.items))
+    for v in VENDORS
+])
+VENDOR_TAX_RATES = np.array([TAX_RATES.get(v.country, DEFAULT_TAX_RATE) for v in VENDORS])
+
+# Per-vendor (sku, desc, currency) for each catalog item, with the vendor's
+# currency filled in for items that don't override it
+VENDOR_CATALOG_META = tuple(
+    tuple((item.sku, item.desc, item.currency or v.currency) for item in v.items)
+    for v in VENDORS
+)
+
+# Vendor x buyer FX: rate from the vendor's to the buyer's currency, and
+# whether the invoice shows home-currency totals (cross-border sales only)
+VENDOR_BUYER_FX_RATES = np.array([
+    [get_fx_rate(v.currency, b.currency) for b in BUYERS] for v in VENDORS
+])
+VENDOR_BUYER_APPLY_FX = np.array([
+    [b.country != v.country for b in BUYERS] for v in VENDORS
+])
 
 # ============================================================
 # STYLES
@@ -170,7 +250,7 @@ style_heading = styles["Heading1"]
 style_right = ParagraphStyle(name='RightAlign', parent=styles['Normal'], alignment=2)
 style_bold = ParagraphStyle(name='Bold', parent=styles['Normal'], fontName='Helvetica-Bold')
 
-# Japanese-capable paragraph style (or Helvetica as fallback)
+# Japanese-capable paragraph style (Helvetica until _ensure_fonts() runs)
 jp_style = ParagraphStyle(
     name='JP',
     parent=styles['Normal'],
@@ -196,6 +276,152 @@ meta_style = ParagraphStyle(
     leading=11,
 )
 
+# Red bold style for chaos notes
+CHAOS_NOTE_STYLE = ParagraphStyle(
+    'ChaosNote',
+    parent=styles['Normal'],
+    textColor=colors.red,
+    fontName='Helvetica-Bold',
+)
+
+# ============================================================
+# COUNTRY / VENDOR LOOKUPS
+# ============================================================
+
+DEFAULT_HEADER_COLOR = colors.HexColor("#2C3E50")
+
+# Country-specific header background color
+COUNTRY_BG = {
+    "India": colors.HexColor("#1B5E20"),
+    "Germany": colors.HexColor("#B71C1C"),
+    "Sweden": colors.HexColor("#0D47A1"),
+    "Japan": colors.HexColor("#4A148C"),
+}
+
+# Header fonts by vendor country; _ensure_fonts() maps Japan to the
+# registered Japanese font when one is available
+HEADER_BOLD_FONT_BY_COUNTRY = defaultdict(lambda: 'Helvetica-Bold')
+HEADER_REG_FONT_BY_COUNTRY = defaultdict(lambda: 'Helvetica')
+
+# GRN receiving location by vendor country
+DEFAULT_RECEIVED_AT = "Dock 4, Warehouse A"
+GRN_RECEIVED_AT = {
+    "India": "Dock 2, Mumbai Warehouse",
+    "Germany": "Tor 5, Lagerhaus Berlin",
+    "Sweden": "Kaj 3, Stockholm Logistikcenter",
+    "Japan": "Bay 7, Tokyo Logistics Hub",
+}
+
+# Invoice item column widths are the same for every vendor layout
+INV_COLWIDTHS = (20 * mm, 33 * mm, 50 * mm, 15 * mm, 30 * mm, 30 * mm)
+
+DEFAULT_INVOICE_LAYOUT = (
+    ["#", "SKU", "Description", "Qty", "Unit Price", "Total"],
+    DEFAULT_HEADER_COLOR,
+)
+
+# Vendor-specific invoice table layout: (columns, header_color)
+INVOICE_LAYOUT_BY_VENDOR = {
+    "Nordic Chipsets AB": (
+        ["#", "SKU", "Nordic Item", "Qty", "Unit", "Line Total"],
+        COUNTRY_BG["Sweden"],
+    ),
+    "Nippon Logic Ltd - 日本": (
+        ["通し番号", "在庫管理番号", "品目", "数量", "単価", "金額"],
+        COUNTRY_BG["Japan"],
+    ),
+    "Berlin Hardware GmbH": (
+        ["Pos.", "SKU", "Artikel", "Menge", "Einzelpreis", "Gesamt"],
+        COUNTRY_BG["Germany"],
+    ),
+    "Mumbai Micro Devices": (
+        ["#", "SKU", "Item Description", "Qty", "Rate", "Amount"],
+        COUNTRY_BG["India"],
+    ),
+}
+
+# Country-specific invoice footer lines: (context key, default text, markup, style)
+INV_FOOTER_LINES = {
+    "India": (
+        ('payment_terms', 'Payment due within 30 days from invoice date.', "<b>Payment Terms:</b> {}", style_normal),
+        ('bank_details', 'Bank: ICICI Bank, A/C: 2715500356, IFSC: ICIC045F, Branch: Mumbai', "<b>Bank Details:</b> {}", style_normal),
+        ('footer_note', 'Goods once sold will not be taken back. Subject to Maharashtra jurisdiction.', "{}", style_normal),
+    ),
+    "Germany": (
+        ('de_payment_terms', 'Zahlbar innerhalb von 14 Tagen ohne Abzug.', "<b>Zahlungsziel:</b> {}", style_normal),
+        ('de_footer_note', 'Es gelten unsere allgemeinen Geschäftsbedingungen.', "{}", style_normal),
+    ),
+    "USA": (
+        ('us_payment_terms', 'Payment due within 30 days. Please remit in USD.', "<b>Payment Terms:</b> {}", style_normal),
+        ('us_footer_note', 'Thank you for your business.', "{}", style_normal),
+    ),
+    "Sweden": (
+        ('se_payment_terms', 'Betalningsvillkor: 30 dagar netto.', "<b>Betalningsvillkor:</b> {}", style_normal),
+        ('se_footer_note', 'Org.nr och momsregistreringsnummer finns angivna ovan.', "{}", style_normal),
+    ),
+    # Use Japanese style for footer so characters render correctly
+    "Japan": (
+        ('jp_payment_terms', 'お支払条件：請求書受領後30日以内にお振込みください。', "{}", jp_style),
+        ('jp_footer_note', '本請求書に関するお問い合わせは経理部までご連絡ください。', "{}", jp_style),
+    ),
+}
+
+# Static paragraphs, parsed once. reportlab marks a flowable it pushes to the
+# next page (_postponed) and never clears the mark, so builds append copies
+# rather than these instances.
+PO_HEADING = Paragraph("Purchase Order Line Items", section_heading_style)
+INV_HEADING = Paragraph("Invoice Line Items", section_heading_style)
+GRN_HEADING = Paragraph("Received Items", section_heading_style)
+TOTALS_HEADING = Paragraph("Totals Summary", section_heading_style)
+CERT_LINE = Paragraph(
+    "Certification: I hereby certify that the goods listed above have been received and inspected.",
+    style_normal,
+)
+SIGN_LINE = Paragraph("Signed: __________________________", style_normal)
+
+# ============================================================
+# TABLE LAYOUTS & STYLES
+# ============================================================
+
+INFO_COLWIDTHS = (90 * mm, 90 * mm)
+PO_COLWIDTHS = (10 * mm, 33 * mm, 73 * mm, 18 * mm, 22 * mm, 20 * mm)
+GRN_COLWIDTHS = (10 * mm, 33 * mm, 80 * mm, 25 * mm, 30 * mm)
+TOTALS_COLWIDTHS = (145 * mm, 35 * mm)
+CELL_PADDING = 12  # Default Table LEFTPADDING + RIGHTPADDING (points)
+
+INFO_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+])
+
+TOTALS_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),  # Bold last row
+    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor("#E8E8E8")),
+    ('BOX', (0, -1), (-1, -1), 0.75, colors.black),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+# Items table commands shared by every document type (including row
+# striping). The trailing header background and font entries are defaults
+# that _items_table swaps in place per document.
+BASE_TABLE_STYLE_CMDS = (
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (1, 1), (1, -1), 'LEFT'),   # SKU left
+    ('ALIGN', (2, 0), (2, -1), 'LEFT'),   # Description left
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ('TOPPADDING', (0, 0), (-1, 0), 6),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#E0E0E0")),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#F9F9F9")]),  # Striping
+    ('BACKGROUND', (0, 0), (-1, 0), DEFAULT_HEADER_COLOR),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+)
+HEADER_BG_CMD_INDEX = len(BASE_TABLE_STYLE_CMDS) - 2
+HEADER_FONT_CMD_INDEX = len(BASE_TABLE_STYLE_CMDS) - 1
+
 # ============================================================
 # HEADER & FOOTER DRAWING FUNCTIONS
 # ============================================================
@@ -229,22 +455,13 @@ def draw_header_footer(c, doc, title_text, company_name="Global Tech Corporation
 
 def draw_vendor_header(c, doc, title_text, vendor):
     c.saveState()
-    country = vendor.get("country", "")
-    name = vendor.get("name", "Vendor")
-    header_title = vendor.get("header_title", title_text)
-    tagline = vendor.get("tagline", None)
+    country = vendor.country
+    name = vendor.name
+    header_title = vendor.header_title or title_text
+    tagline = vendor.tagline
 
     # Country-specific background color
-    if country == "India":
-        bg_color = colors.HexColor("#1B5E20")
-    elif country == "Germany":
-        bg_color = colors.HexColor("#B71C1C")
-    elif country == "Sweden":
-        bg_color = colors.HexColor("#0D47A1")
-    elif country == "Japan":
-        bg_color = colors.HexColor("#4A148C")
-    else:
-        bg_color = colors.HexColor("#2C3E50")
+    bg_color = COUNTRY_BG.get(country, DEFAULT_HEADER_COLOR)
 
     # Top bar
     c.setFillColor(bg_color)
@@ -252,10 +469,8 @@ def draw_vendor_header(c, doc, title_text, vendor):
     c.setFillColor(colors.white)
 
     # Vendor name (Japanese-capable font if needed)
-    if country == "Japan" and HAS_JAPANESE_FONT:
-        c.setFont(JAPANESE_FONT, 16)
-    else:
-        c.setFont("Helvetica-Bold", 16)
+    bold_font = HEADER_BOLD_FONT_BY_COUNTRY[country]
+    c.setFont(bold_font, 16)
     c.drawString(15 * mm, A4[1] - 16 * mm, name)
 
     # Country on right
@@ -264,18 +479,12 @@ def draw_vendor_header(c, doc, title_text, vendor):
 
     # Header title (Invoice / 請求書 etc.)
     c.setFillColor(bg_color)
-    if country == "Japan" and HAS_JAPANESE_FONT:
-        c.setFont(JAPANESE_FONT, 20)
-    else:
-        c.setFont("Helvetica-Bold", 20)
+    c.setFont(bold_font, 20)
     c.drawString(15 * mm, A4[1] - 42 * mm, header_title)
 
     # Tagline if available
     if tagline:
-        if country == "Japan" and HAS_JAPANESE_FONT:
-            c.setFont(JAPANESE_FONT, 9)
-        else:
-            c.setFont("Helvetica", 9)
+        c.setFont(HEADER_REG_FONT_BY_COUNTRY[country], 9)
         c.setFillColor(colors.white)
         c.drawString(15 * mm, A4[1] - 49 * mm, tagline)
 
@@ -301,50 +510,57 @@ def create_grn_template(c, doc):
 # CONTENT GENERATION HELPERS
 # ============================================================
 
+_SMALL_INT_STR = tuple(str(i) for i in range(256))
+
+
+def _row_number(i):
+    return _SMALL_INT_STR[i] if i < 256 else str(i)
+
+
+def _desc_cell(text, col_width):
+    """Item description cell: a plain string when it fits on one line.
+
+    Plain strings skip Paragraph markup parsing and line breaking; text with
+    markup, non-Latin characters or that would need wrapping still gets a
+    Paragraph.
+    """
+    if not text.isascii():
+        return Paragraph(text, jp_style)
+    if ('<' not in text and '&' not in text
+            and pdfmetrics.stringWidth(text, style_normal.fontName, style_normal.fontSize) <= col_width - CELL_PADDING):
+        return text
+    return Paragraph(text, style_normal)
+
+
 def create_info_table(left_data, right_data):
     """Creates a 2-column layout for address/info details"""
     data = [[left_data, right_data]]
-    t = Table(data, colWidths=[90 * mm, 90 * mm])
-    t.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-    ]))
+    t = Table(data, colWidths=INFO_COLWIDTHS)
+    t.setStyle(INFO_TABLE_STYLE)
     return t
 
 
 def get_invoice_layout(vendor):
-    name = vendor.get("name", "")
-    country = vendor.get("country", "")
-
-    if "Nordic Chipsets" in name:
-        columns = ["#", "SKU", "Nordic Item", "Qty", "Unit", "Line Total"]
-        col_widths = [20 * mm, 33 * mm, 50 * mm, 15 * mm, 30 * mm, 30 * mm]
-        header_color = colors.HexColor("#0D47A1")
-    elif "Nippon Logic" in name:
-        columns = ["通し番号", "在庫管理番号", "品目", "数量", "単価", "金額"]
-        col_widths = [20 * mm, 33 * mm, 50 * mm, 15 * mm, 30 * mm, 30 * mm]
-        header_color = colors.HexColor("#4A148C")
-    elif "Berlin Hardware" in name:
-        columns = ["Pos.", "SKU", "Artikel", "Menge", "Einzelpreis", "Gesamt"]
-        col_widths = [20 * mm, 33 * mm, 50 * mm, 15 * mm, 30 * mm, 30 * mm]
-        header_color = colors.HexColor("#B71C1C")
-    elif "Mumbai Micro" in name:
-        columns = ["#", "SKU", "Item Description", "Qty", "Rate", "Amount"]
-        col_widths = [20 * mm, 33 * mm, 50 * mm, 15 * mm, 30 * mm, 30 * mm]
-        header_color = colors.HexColor("#1B5E20")
-    else:
-        columns = ["#", "SKU", "Description", "Qty", "Unit Price", "Total"]
-        col_widths = [20 * mm, 33 * mm, 50 * mm, 15 * mm, 30 * mm, 30 * mm]
-        header_color = colors.HexColor("#2C3E50")
-
-    return columns, col_widths, header_color
+    return INVOICE_LAYOUT_BY_VENDOR.get(vendor.name, DEFAULT_INVOICE_LAYOUT)
 
 
 def format_currency(amount, currency):
+    # Round first so floats that render identically share a cache entry
+    return _format_currency(round(amount, 2), currency)
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_currency(amount, currency):
     return f"{currency} {amount:,.2f}"
 
 
+def format_amount(amount, currency):
+    """Formats with the currency code when there is one, bare otherwise."""
+    if currency:
+        return format_currency(amount, currency)
+    return f"{amount:.2f}"
+
+
 def format_date(d):
     if isinstance(d, (datetime.date, datetime.datetime)):
         return d.strftime("%Y-%m-%d")
@@ -354,73 +570,110 @@ def format_date(d):
 # MAIN PDF GENERATOR
 # ============================================================
 
-def generate_pdf(filename, context, doc_type):
-    doc = SimpleDocTemplate(
-        filename,
-        pagesize=A4,
-        rightMargin=15 * mm,
-        leftMargin=15 * mm,
-        topMargin=50 * mm,
-        bottomMargin=20 * mm,
-    )
-
-    elements = []
+class _ReusableDocTemplate(BaseDocTemplate):
+    """A4 document template whose frame and page template are set up once.
+
+    SimpleDocTemplate re-creates its page templates on every build; here the
+    page decoration is swapped per document through ``on_page`` instead.
+    """
+
+    def __init__(self):
+        BaseDocTemplate.__init__(
+            self,
+            None,
+            pagesize=A4,
+            rightMargin=15 * mm,
+            leftMargin=15 * mm,
+            topMargin=50 * mm,
+            bottomMargin=20 * mm,
+        )
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='Page', frames=[frame], onPage=self._draw_page)])
+        self.on_page = None
+
+    def _draw_page(self, c, doc):
+        self.on_page(c, doc)
+
+
+class DocumentBuilder:
+    """Builds PO, invoice and GRN PDFs.
+
+    The document template and output buffer are reused across documents;
+    each PDF is rendered in memory, written to a temporary file in a single
+    write and then moved into place.
+    """
+
+    def __init__(self):
+        _ensure_fonts()
+        self._doc = _ReusableDocTemplate()
+        self._buffer = io.BytesIO()
+        # Footer paragraphs for the default texts, parsed once. reportlab
+        # marks a flowable it pushes to the next page (_postponed) and never
+        # clears the mark, so each invoice gets a copy, not the instance.
+        # Built after font setup since Paragraphs capture the font on parse.
+        self._footer_paragraphs = {
+            country: [Paragraph(markup.format(default), style) for _, default, markup, style in lines]
+            for country, lines in INV_FOOTER_LINES.items()
+        }
 
-    # 1. Top Metadata Block (Right Aligned under title)
-    date_str = format_date(context.get('date'))
+    def build_po(self, filename, context):
+        date_str = format_date(context.get('date'))
 
-    if doc_type == "PO":
+        # 1. Top Metadata Block (Right Aligned under title)
         meta_text = (
             f"<b>PO Number:</b> {context['po_num']}<br/>"
             f"<b>Date:</b> {date_str}<br/>"
             f"<b>Currency:</b> {context['currency']}"
         )
-        on_page_func = create_po_template
-    elif doc_type == "INV":
-        meta_text = (
-            f"<b>Invoice #:</b> {context['inv_num']}<br/>"
-            f"<b>Date:</b> {date_str}<br/>"
-            f"<b>Ref PO:</b> {context['ref_po']}"
-        )
-        vendor = context["vendor"]
+        elements = [Paragraph(meta_text, meta_style), Spacer(1, 6 * mm)]
 
-        def _inv_header(c, d, v=vendor, t="COMMERCIAL INVOICE"):
-            draw_vendor_header(c, d, t, v)
-
-        on_page_func = _inv_header
-    else:  # GRN
-        meta_text = (
-            f"<b>GRN Ref:</b> {context['grn_num']}<br/>"
-            f"<b>Date Received:</b> {date_str}<br/>"
-            f"<b>PO Ref:</b> {context['ref_po']}"
-        )
-        on_page_func = create_grn_template
-
-    elements.append(Paragraph(meta_text, meta_style))
-    elements.append(Spacer(1, 6 * mm))
-
-    # 2. Address / Party Sections
-    if doc_type == "PO":
+        # 2. Address / Party Sections
+        vendor = context['vendor']
         left_html = (
-            f"<b>VENDOR:</b><br/>{context['vendor']['name']}"
-            f"<br/>{context['vendor']['address']}<br/>{context['vendor']['country']}"
+            f"<b>VENDOR:</b><br/>{vendor.name}"
+            f"<br/>{vendor.address}<br/>{vendor.country}"
         )
-        buyer = context.get('buyer', {})
+        buyer = context.get('buyer')
         right_html = (
             f"<b>SHIP TO:</b><br/>Global Tech Corp Warehouse A<br/>"
             f"4500 Technology Dr<br/>San Jose, CA 95134, USA<br/><br/>"
-            f"<b>Buyer:</b> {buyer.get('name','Global Tech Corp')}"
+            f"<b>Buyer:</b> {buyer.name if buyer else 'Global Tech Corp'}"
         )
         elements.append(create_info_table(Paragraph(left_html, style_normal), Paragraph(right_html, style_normal)))
+        elements.append(Spacer(1, 8 * mm))
 
-    elif doc_type == "INV":
+        # 3. Items
+        elements.append(copy.copy(PO_HEADING))
+        elements.append(Spacer(1, 2 * mm))
+        data = [["#", "SKU", "Description", "Qty", "Unit Price", "Total"]]
+        data.extend(self._priced_rows(context, PO_COLWIDTHS[2]))
+        elements.append(self._items_table(data, PO_COLWIDTHS, DEFAULT_HEADER_COLOR))
+        elements.append(Spacer(1, 5 * mm))
+
+        # 4. Totals & Notes
+        self._append_totals(elements, context)
+        self._append_note(elements, context)
+
+        self._render(filename, elements, create_po_template)
+
+    def build_inv(self, filename, context):
+        date_str = format_date(context.get('date'))
         vendor = context['vendor']
-        buyer = context.get('buyer', {})
+        buyer = context.get('buyer')
 
-        buyer_name = buyer.get('name', 'Buying Company')
-        buyer_country = context.get('buyer_country', buyer.get('country', ''))
-        vendor_country = vendor.get('country')
+        buyer_name = buyer.name if buyer else 'Buying Company'
+        buyer_country = context.get('buyer_country', buyer.country if buyer else '')
+        vendor_country = vendor.country
+
+        # 1. Top Metadata Block (Right Aligned under title)
+        meta_text = (
+            f"<b>Invoice #:</b> {context['inv_num']}<br/>"
+            f"<b>Date:</b> {date_str}<br/>"
+            f"<b>Ref PO:</b> {context['ref_po']}"
+        )
+        elements = [Paragraph(meta_text, meta_style), Spacer(1, 6 * mm)]
 
+        # 2. Address / Party Sections
         # Use Japanese paragraph style for Japanese vendor/buyer blocks
         addr_style = jp_style if vendor_country == "Japan" else style_normal
 
@@ -428,7 +681,7 @@ def generate_pdf(filename, context, doc_type):
             f"<b>BILL TO:</b><br/>{buyer_name}<br/>{buyer_country}"
         )
         right_html = (
-            f"<b>REMIT TO:</b><br/>{vendor['name']}<br/>{vendor['address']}<br/>{vendor['country']}"
+            f"<b>REMIT TO:</b><br/>{vendor.name}<br/>{vendor.address}<br/>{vendor.country}"
         )
 
         elements.append(create_info_table(Paragraph(left_html, addr_style), Paragraph(right_html, addr_style)))
@@ -472,10 +725,51 @@ def generate_pdf(filename, context, doc_type):
             elements.append(Spacer(1, 3 * mm))
             elements.append(create_info_table(Paragraph(left_block, style_normal), Paragraph(right_block, style_normal)))
 
-    else:  # GRN
-        vendor = context.get('vendor') or {}
-        v_name = vendor.get('name', 'External Vendor')
-        v_country = vendor.get('country', '')
+        elements.append(Spacer(1, 8 * mm))
+
+        # 3. Items
+        elements.append(copy.copy(INV_HEADING))
+        elements.append(Spacer(1, 2 * mm))
+        columns, header_color = get_invoice_layout(vendor)
+        data = [list(columns)]
+        data.extend(self._priced_rows(context, INV_COLWIDTHS[2]))
+        header_font = HEADER_BOLD_FONT_BY_COUNTRY[vendor_country]
+        elements.append(self._items_table(data, INV_COLWIDTHS, header_color, header_font))
+        elements.append(Spacer(1, 5 * mm))
+
+        # 4. Totals & Notes
+        self._append_totals(elements, context)
+        self._append_note(elements, context)
+
+        # Country-specific invoice footer blocks; only context overrides
+        # need to be parsed, the defaults are copied
+        footer_lines = INV_FOOTER_LINES.get(vendor_country, ())
+        footer_paragraphs = self._footer_paragraphs.get(vendor_country, ())
+        for (key, _, markup, style), paragraph in zip(footer_lines, footer_paragraphs):
+            if key in context:
+                paragraph = Paragraph(markup.format(context[key]), style)
+            else:
+                paragraph = copy.copy(paragraph)
+            elements.append(paragraph)
+
+        on_page = functools.partial(draw_vendor_header, title_text="COMMERCIAL INVOICE", vendor=vendor)
+        self._render(filename, elements, on_page)
+
+    def build_grn(self, filename, context):
+        date_str = format_date(context.get('date'))
+
+        # 1. Top Metadata Block (Right Aligned under title)
+        meta_text = (
+            f"<b>GRN Ref:</b> {context['grn_num']}<br/>"
+            f"<b>Date Received:</b> {date_str}<br/>"
+            f"<b>PO Ref:</b> {context['ref_po']}"
+        )
+        elements = [Paragraph(meta_text, meta_style), Spacer(1, 6 * mm)]
+
+        # 2. Address / Party Sections
+        vendor = context.get('vendor')
+        v_name = vendor.name if vendor else 'External Vendor'
+        v_country = vendor.country if vendor else ''
 
         left_html = (
             f"<b>RECEIVED FROM:</b><br/>{v_name}<br/>"
@@ -483,16 +777,7 @@ def generate_pdf(filename, context, doc_type):
         )
 
         # Vary GRN receiving location by vendor country
-        if v_country == 'India':
-            received_at = "Dock 2, Mumbai Warehouse"
-        elif v_country == 'Germany':
-            received_at = "Tor 5, Lagerhaus Berlin"
-        elif v_country == 'Sweden':
-            received_at = "Kaj 3, Stockholm Logistikcenter"
-        elif v_country == 'Japan':
-            received_at = "Bay 7, Tokyo Logistics Hub"
-        else:
-            received_at = "Dock 4, Warehouse A"
+        received_at = GRN_RECEIVED_AT.get(v_country, DEFAULT_RECEIVED_AT)
 
         right_html = (
             f"<b>RECEIVED AT:</b><br/>{received_at}<br/>"
@@ -511,95 +796,67 @@ def generate_pdf(filename, context, doc_type):
         )
         elements.append(Spacer(1, 3 * mm))
         elements.append(create_info_table(Paragraph(grn_meta_left, style_normal), Paragraph(grn_meta_right, style_normal)))
+        elements.append(Spacer(1, 8 * mm))
 
-    elements.append(Spacer(1, 8 * mm))
-
-    # 3. Section Heading for Items
-    if doc_type == "PO":
-        elements.append(Paragraph("Purchase Order Line Items", section_heading_style))
-    elif doc_type == "INV":
-        elements.append(Paragraph("Invoice Line Items", section_heading_style))
-    else:
-        elements.append(Paragraph("Received Items", section_heading_style))
-
-    elements.append(Spacer(1, 2 * mm))
-
-    # 4. Items Table
-    if doc_type == "GRN":
+        # 3. Items
+        elements.append(copy.copy(GRN_HEADING))
+        elements.append(Spacer(1, 2 * mm))
         data = [["#", "SKU", "Description", "Qty Rcvd", "Inspection Status"]]
-        col_widths = [10 * mm, 33 * mm, 80 * mm, 25 * mm, 30 * mm]
-        header_color = colors.HexColor("#2C3E50")
-    elif doc_type == "INV":
-        columns, col_widths, header_color = get_invoice_layout(context["vendor"])
-        data = [columns]
-    else:  # PO
-        data = [["#", "SKU", "Description", "Qty", "Unit Price", "Total"]]
-        col_widths = [10 * mm, 33 * mm, 73 * mm, 18 * mm, 22 * mm, 20 * mm]
-        header_color = colors.HexColor("#2C3E50")
-
-    for i, item in enumerate(context['items'], 1):
-        if doc_type == "GRN":
-            desc_text = item['desc']
-            desc_cell = Paragraph(desc_text, style_normal)
-            row = [
-                str(i),
+        desc_width = GRN_COLWIDTHS[2]
+        data.extend([
+            [
+                _row_number(i),
                 item.get('sku', ''),
-                desc_cell,
+                _desc_cell(item['desc'], desc_width),
                 str(item['qty']),
                 item.get('status', 'OK'),
             ]
-        else:
-            # Determine currency for the row
-            row_currency = item.get('currency', context.get('currency', ''))
-            if row_currency:
-                unit_price_str = format_currency(item['unit_price'], row_currency)
-                total_str = format_currency(item.get('total', 0), row_currency)
-            else:
-                unit_price_str = f"{item['unit_price']:.2f}"
-                total_str = f"{item.get('total', 0):.2f}"
-            desc_cell = Paragraph(item['desc'], style_normal)
-            row = [
-                str(i),
-                item.get('sku', ''),
-                desc_cell,
-                str(item['qty']),
-                unit_price_str,
-                total_str,
-            ]
-        data.append(row)
-
-    t = Table(data, colWidths=col_widths)
-
-    vendor_country = context.get('vendor', {}).get('country') if doc_type == "INV" else None
-
-    t_style = [
-        ('BACKGROUND', (0, 0), (-1, 0), header_color),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (1, 1), (1, -1), 'LEFT'),   # SKU left
-        ('ALIGN', (2, 0), (2, -1), 'LEFT'),   # Description left
-        ('FONTNAME', (0, 0), (-1, 0), JAPANESE_FONT if (doc_type == "INV" and vendor_country == "Japan" and HAS_JAPANESE_FONT) else 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('TOPPADDING', (0, 0), (-1, 0), 6),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#E0E0E0")),
-    ]
+            for i, item in enumerate(context['items'], 1)
+        ])
+        elements.append(self._items_table(data, GRN_COLWIDTHS, DEFAULT_HEADER_COLOR, amounts_right=False))
+        elements.append(Spacer(1, 5 * mm))
 
-    # Striping
-    for i in range(1, len(data)):
-        if i % 2 == 0:
-            t_style.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor("#F9F9F9")))
+        # 4. Notes & Certification
+        self._append_note(elements, context)
+        elements.append(Spacer(1, 10 * mm))
+        elements.append(copy.copy(CERT_LINE))
+        elements.append(Spacer(1, 15 * mm))
+        elements.append(copy.copy(SIGN_LINE))
 
-    if doc_type != "GRN":
-        t_style.append(('ALIGN', (3, 1), (-1, -1), 'RIGHT'))  # Quantities & prices right
+        self._render(filename, elements, create_grn_template)
 
-    t.setStyle(TableStyle(t_style))
-    elements.append(t)
-    elements.append(Spacer(1, 5 * mm))
+    def _priced_rows(self, context, desc_width):
+        """Item rows with unit price and line total (PO / invoice)."""
+        default_currency = context.get('currency', '')
+        fmt = format_amount
+        return [
+            [
+                _row_number(i),
+                item.get('sku', ''),
+                _desc_cell(item['desc'], desc_width),
+                str(item['qty']),
+                # Each row may carry its own currency
+                fmt(item['unit_price'], row_currency := item.get('currency', default_currency)),
+                fmt(item.get('total', 0), row_currency),
+            ]
+            for i, item in enumerate(context['items'], 1)
+        ]
 
-    # 5. Totals (Not for GRN)
-    if doc_type != "GRN":
+    def _items_table(self, data, col_widths, header_color, header_font='Helvetica-Bold', amounts_right=True):
+        t = Table(data, colWidths=col_widths)
+        t_style = list(BASE_TABLE_STYLE_CMDS)
+        if header_color is not DEFAULT_HEADER_COLOR:
+            t_style[HEADER_BG_CMD_INDEX] = ('BACKGROUND', (0, 0), (-1, 0), header_color)
+        if header_font != 'Helvetica-Bold':
+            t_style[HEADER_FONT_CMD_INDEX] = ('FONTNAME', (0, 0), (-1, 0), header_font)
+        if amounts_right:
+            t_style.append(('ALIGN', (3, 1), (-1, -1), 'RIGHT'))  # Quantities & prices right
+        t.setStyle(TableStyle(t_style))
+        return t
+
+    def _append_totals(self, elements, context):
         elements.append(Spacer(1, 4 * mm))
-        elements.append(Paragraph("Totals Summary", section_heading_style))
+        elements.append(copy.copy(TOTALS_HEADING))
         elements.append(Spacer(1, 2 * mm))
 
         tax_rate = context.get('tax_rate', DEFAULT_TAX_RATE)
@@ -620,243 +877,295 @@ def generate_pdf(filename, context, doc_type):
                 format_currency(grand_total_home, home_currency)
             ])
 
-        t_totals = Table(total_data, colWidths=[145 * mm, 35 * mm])
-        t_totals.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),  # Bold last row
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor("#E8E8E8")),
-            ('BOX', (0, -1), (-1, -1), 0.75, colors.black),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+        t_totals = Table(total_data, colWidths=TOTALS_COLWIDTHS)
+        t_totals.setStyle(TOTALS_TABLE_STYLE)
         elements.append(t_totals)
 
-    # 6. Chaos Notes / Footer Text
-    elements.append(Spacer(1, 8 * mm))
-    if context.get('note'):
-        note_style = ParagraphStyle(
-            'ChaosNote',
-            parent=styles['Normal'],
-            textColor=colors.red,
-            fontName='Helvetica-Bold',
-        )
-        elements.append(Paragraph(f"NOTE: {context['note']}", note_style))
-
-    # Country-specific invoice footer blocks
-    if doc_type == "INV" and vendor_country == "India":
-        payment_terms = context.get('payment_terms', 'Payment due within 30 days from invoice date.')
-        bank_details = context.get('bank_details', 'Bank: ICICI Bank, A/C: 2715500356, IFSC: ICIC045F, Branch: Mumbai')
-        footer_note = context.get('footer_note', 'Goods once sold will not be taken back. Subject to Maharashtra jurisdiction.')
-
-        elements.append(Paragraph(f"<b>Payment Terms:</b> {payment_terms}", style_normal))
-        elements.append(Paragraph(f"<b>Bank Details:</b> {bank_details}", style_normal))
-        elements.append(Paragraph(footer_note, style_normal))
+    def _append_note(self, elements, context):
+        # Chaos Notes / Footer Text
+        elements.append(Spacer(1, 8 * mm))
+        if context.get('note'):
+            elements.append(Paragraph(f"NOTE: {context['note']}", CHAOS_NOTE_STYLE))
 
-    if doc_type == "INV" and vendor_country == "Germany":
-        de_payment_terms = context.get('de_payment_terms', 'Zahlbar innerhalb von 14 Tagen ohne Abzug.')
-        de_footer_note = context.get('de_footer_note', 'Es gelten unsere allgemeinen Geschäftsbedingungen.')
+    def _render(self, filename, elements, on_page):
+        buf = self._buffer
+        buf.seek(0)
+        buf.truncate()
+        self._doc.on_page = on_page
+        self._doc.build(elements, filename=buf)
 
-        elements.append(Paragraph(f"<b>Zahlungsziel:</b> {de_payment_terms}", style_normal))
-        elements.append(Paragraph(de_footer_note, style_normal))
+        # Publish atomically so the ingester never picks up a partial PDF
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, "wb") as f, buf.getbuffer() as view:
+            f.write(view)
+        os.replace(tmp_filename, filename)
 
-    if doc_type == "INV" and vendor_country == "USA":
-        us_payment_terms = context.get('us_payment_terms', 'Payment due within 30 days. Please remit in USD.')
-        us_footer_note = context.get('us_footer_note', 'Thank you for your business.')
 
-        elements.append(Paragraph(f"<b>Payment Terms:</b> {us_payment_terms}", style_normal))
-        elements.append(Paragraph(us_footer_note, style_normal))
+_builder = None
 
-    if doc_type == "INV" and vendor_country == "Sweden":
-        se_payment_terms = context.get('se_payment_terms', 'Betalningsvillkor: 30 dagar netto.')
-        se_footer_note = context.get('se_footer_note', 'Org.nr och momsregistreringsnummer finns angivna ovan.')
 
-        elements.append(Paragraph(f"<b>Betalningsvillkor:</b> {se_payment_terms}", style_normal))
-        elements.append(Paragraph(se_footer_note, style_normal))
-
-    if doc_type == "INV" and vendor_country == "Japan":
-        jp_payment_terms = context.get(
-            'jp_payment_terms',
-            'お支払条件：請求書受領後30日以内にお振込みください。'
-        )
-        jp_footer_note = context.get(
-            'jp_footer_note',
-            '本請求書に関するお問い合わせは経理部までご連絡ください。'
-        )
-
-        # Use Japanese style for footer so characters render correctly
-        elements.append(Paragraph(jp_payment_terms, jp_style))
-        elements.append(Paragraph(jp_footer_note, jp_style))
-
-    if doc_type == "GRN":
-        elements.append(Spacer(1, 10 * mm))
-        elements.append(Paragraph(
-            "Certification: I hereby certify that the goods listed above have been received and inspected.",
-            style_normal,
-        ))
-        elements.append(Spacer(1, 15 * mm))
-        elements.append(Paragraph("Signed: __________________________", style_normal))
+def generate_pdf(filename, context, doc_type):
+    global _builder
+    if _builder is None:
+        _builder = DocumentBuilder()
 
-    # Build PDF
-    doc.build(elements, onFirstPage=on_page_func, onLaterPages=on_page_func)
+    if doc_type == "PO":
+        _builder.build_po(filename, context)
+    elif doc_type == "INV":
+        _builder.build_inv(filename, context)
+    else:  # GRN
+        _builder.build_grn(filename, context)
 
 # ============================================================
 # DATASET GENERATOR
 # ============================================================
 
-def generate_dataset():
-    print(f"Generating {NUM_TRANSACTIONS} ReportLab PDF transaction sets...")
-
-    for i in range(NUM_TRANSACTIONS):
-        # 1. Base Logic
-        vendor = random.choice(VENDORS)
-        buyer = random.choice(BUYERS)
-        po_num = f"PO-{random.randint(10000, 99999)}"
-        date_po = datetime.date.today() - datetime.timedelta(days=random.randint(10, 60))
-        tax_rate = TAX_RATES.get(vendor['country'], DEFAULT_TAX_RATE)
-
-        # Select Items - ensure unique item descriptions per document,
-        # using this vendor's exclusive catalog (vendor['items']).
-        num_items = random.randint(1, 4)
-        total_po_cost = 0
-        selected_items = []
-
-        vendor_items = vendor.get("items", [])
-        chosen_templates = random.sample(vendor_items, k=min(num_items, len(vendor_items))) if vendor_items else []
-
-        for item_tmpl in chosen_templates:
-            qty = random.randint(1, 10)
-            price = random.randint(*item_tmpl["price_range"])
-            line_total = qty * price
-            total_po_cost += line_total
-
-            item_currency = item_tmpl.get("currency", vendor["currency"])
-
-            selected_items.append({
-                "sku": item_tmpl.get("sku", ""),
-                "desc": item_tmpl["desc"],
-                "qty": qty,
-                "unit_price": price,
-                "total": line_total,
-                "currency": item_currency,
-                "tax_rate": tax_rate,
-            })
-
-        # --- GENERATE PURCHASE ORDER ---
-        po_context = {
+def draw_transactions(rng, n):
+    """Draws the numeric side of `n` transaction sets at once.
+
+    Returns one plan per transaction: vendor and buyer indices, document
+    numbers and date offsets, the PO's (catalog index, qty, unit price, line
+    total) lines and totals, and the invoice's chaos type, totals and (for
+    cross-border sales) FX amounts.
+    """
+    vendor_idx = rng.integers(0, len(VENDORS), n)
+    buyer_idx = rng.integers(0, len(BUYERS), n)
+
+    # Document numbers and dates: the PO's age, and how many days after it
+    # the goods were received and invoiced
+    po_nums = rng.integers(10000, 100000, n)
+    po_ages = rng.integers(10, 61, n)
+    partial = rng.random(n) < 0.10
+    grn_delays = rng.integers(2, 11, n)
+    invoice_nums = rng.integers(100000, 1000000, n)
+    invoice_delays = rng.integers(5, 16, n)
+    ghost_po_nums = rng.integers(10000, 100000, n)
+
+    sizes = CATALOG_SIZES[vendor_idx]
+    num_items = np.minimum(rng.integers(1, 5, n), sizes)
+
+    # Select Items - ensure unique item descriptions per document, using
+    # the vendor's exclusive catalog: a random ordering of each catalog,
+    # with padding slots sorted last
+    slots = np.arange(MAX_CATALOG_ITEMS)
+    keys = rng.random((n, MAX_CATALOG_ITEMS))
+    keys[slots >= sizes[:, None]] = np.inf
+    item_idx = keys.argsort(axis=1)
+
+    qtys = rng.integers(1, 11, (n, MAX_CATALOG_ITEMS))
+    price_lo = np.take_along_axis(CATALOG_PRICE_LO[vendor_idx], item_idx, axis=1)
+    price_hi = np.take_along_axis(CATALOG_PRICE_HI[vendor_idx], item_idx, axis=1)
+    prices = rng.integers(price_lo, price_hi + 1)
+    line_totals = qtys * prices
+
+    subtotals = np.where(slots < num_items[:, None], line_totals, 0).sum(axis=1)
+    tax_rates = VENDOR_TAX_RATES[vendor_idx]
+    taxes = subtotals * tax_rates
+    grand_totals = subtotals * (1 + tax_rates)
+
+    # Invoice: chaos (-1 for none, else an index into CHAOS_TYPES), the
+    # price-hike markup, and totals in the vendor's and buyer's currency
+    chaos = np.where(rng.random(n) < CHAOS_RATE, rng.integers(0, len(CHAOS_TYPES), n), -1)
+    markups = np.where(chaos == 0, rng.integers(100, 501, n), 0)
+    inv_subtotals = subtotals + markups
+    inv_taxes = inv_subtotals * tax_rates
+    inv_grand_totals = inv_subtotals + inv_taxes
+
+    fx_rates = VENDOR_BUYER_FX_RATES[vendor_idx, buyer_idx]
+    apply_fx = VENDOR_BUYER_APPLY_FX[vendor_idx, buyer_idx]
+    subtotals_home = inv_subtotals * fx_rates
+    taxes_home = inv_taxes * fx_rates
+    grand_totals_home = inv_grand_totals * fx_rates
+
+    return [
+        {
+            "vendor_idx": v,
+            "buyer_idx": b,
             "po_num": po_num,
-            "date": date_po,
-            "currency": vendor['currency'],
-            "vendor": vendor,
-            "buyer": buyer,
-            "items": selected_items,
-            "subtotal": total_po_cost,
-            "tax": total_po_cost * tax_rate,
+            "po_age_days": po_age,
+            "is_partial": is_partial,
+            "grn_delay_days": grn_delay,
+            "invoice_num": invoice_num,
+            "invoice_delay_days": invoice_delay,
+            "ghost_po_num": ghost_po_num,
+            "lines": list(zip(idx[:k], qty[:k], price[:k], total[:k])),
+            "subtotal": subtotal,
             "tax_rate": tax_rate,
-            "grand_total": total_po_cost * (1 + tax_rate),
-        }
-        generate_pdf(f"{OUTPUT_DIR}/incoming/{po_num}.pdf", po_context, "PO")
-
-        # --- GENERATE GRN ---
-        is_partial = random.random() < 0.10
-        grn_date = date_po + datetime.timedelta(days=random.randint(2, 10))
-
-        grn_items = []
-        for item in selected_items:
-            rec_qty = item['qty'] - 1 if (is_partial and item['qty'] > 1) else item['qty']
-            status = 'Accepted' if rec_qty == item['qty'] else 'Partial / Damaged'
-            grn_items.append({
-                "sku": item.get('sku', ''),
-                "desc": item['desc'],
-                "qty": rec_qty,
-                "status": status,
-            })
-
-        grn_context = {
-            "grn_num": f"GR-{po_num[3:]}",
-            "date": grn_date,
-            "ref_po": po_num,
-            "vendor": vendor,
-            "buyer": buyer,
-            "items": grn_items,
-        }
-        generate_pdf(f"{OUTPUT_DIR}/incoming/GRN-{po_num}.pdf", grn_context, "GRN")
-
-        # --- GENERATE INVOICE ---
-        invoice_num = f"INV-{random.randint(100000, 999999)}"
-        invoice_date = date_po + datetime.timedelta(days=random.randint(5, 15))
-
-        chaos_type = "NONE"
-        if random.random() < CHAOS_RATE:
-            chaos_type = random.choice(["PRICE_HIKE", "GHOST_PO", "CURRENCY_ERROR"])
-
-        inv_items = selected_items.copy()
-        inv_subtotal = total_po_cost
-        inv_po_ref = po_num
-        inv_currency = vendor['currency']
-        chaos_note = ""
-
-        if chaos_type == "PRICE_HIKE":
-            markup = random.randint(100, 500)
-            inv_subtotal += markup
-            chaos_note = f"Includes unapproved Service Fee: {markup}"
-            inv_items.append({
-                "sku": "",
-                "desc": "Expedited Shipping Fee",
-                "qty": 1,
-                "unit_price": markup,
-                "total": markup,
-                "currency": vendor['currency'],
-            })
-
-        elif chaos_type == "GHOST_PO":
-            inv_po_ref = f"PO-{random.randint(10000, 99999)}"
-            chaos_note = "System Ref Error: Unknown PO"
-
-        elif chaos_type == "CURRENCY_ERROR":
-            inv_currency = "USD"
-            chaos_note = "Billing Error: Wrong Currency"
-
-        tax = inv_subtotal * tax_rate
-
-        buyer_country = buyer.get('country')
-        buyer_currency = buyer.get('currency')
-        vendor_country = vendor.get('country')
-
-        apply_fx = buyer_country != vendor_country
-
-        inv_context = {
-            "inv_num": invoice_num,
-            "date": invoice_date,
-            "ref_po": inv_po_ref,
-            "vendor": vendor,
-            "buyer": buyer,
-            "currency": inv_currency,
-            "items": inv_items,
-            "subtotal": inv_subtotal,
             "tax": tax,
-            "tax_rate": tax_rate,
-            "grand_total": inv_subtotal + tax,
-            "buyer_country": buyer_country,
-            "buyer_currency": buyer_currency,
-            "note": chaos_note,
+            "grand_total": grand_total,
+            "chaos_type": CHAOS_TYPES[c] if c >= 0 else "NONE",
+            "markup": markup,
+            "inv_subtotal": inv_subtotal,
+            "inv_tax": inv_tax,
+            "inv_grand_total": inv_grand_total,
+            "fx": (fx_rate, subtotal_home, tax_home, grand_total_home) if fx else None,
         }
+        for (
+            v, b, po_num, po_age, is_partial, grn_delay, invoice_num, invoice_delay,
+            ghost_po_num, k, idx, qty, price, total, subtotal, tax_rate, tax, grand_total,
+            c, markup, inv_subtotal, inv_tax, inv_grand_total,
+            fx, fx_rate, subtotal_home, tax_home, grand_total_home,
+        ) in zip(
+            vendor_idx.tolist(), buyer_idx.tolist(), po_nums.tolist(), po_ages.tolist(),
+            partial.tolist(), grn_delays.tolist(), invoice_nums.tolist(),
+            invoice_delays.tolist(), ghost_po_nums.tolist(), num_items.tolist(), item_idx.tolist(),
+            qtys.tolist(), prices.tolist(), line_totals.tolist(), subtotals.tolist(),
+            tax_rates.tolist(), taxes.tolist(), grand_totals.tolist(),
+            chaos.tolist(), markups.tolist(), inv_subtotals.tolist(), inv_taxes.tolist(),
+            inv_grand_totals.tolist(), apply_fx.tolist(), fx_rates.tolist(),
+            subtotals_home.tolist(), taxes_home.tolist(), grand_totals_home.tolist(),
+        )
+    ]
+
+
+def generate_transaction(plan):
+    """Renders the PO, GRN and invoice PDFs for one planned transaction set."""
+    # 1. Base Logic
+    vendor = VENDORS[plan["vendor_idx"]]
+    catalog = VENDOR_CATALOG_META[plan["vendor_idx"]]
+    buyer = BUYERS[plan["buyer_idx"]]
+    po_num = f"PO-{plan['po_num']}"
+    date_po = datetime.date.today() - datetime.timedelta(days=plan["po_age_days"])
+    tax_rate = plan["tax_rate"]
+    total_po_cost = plan["subtotal"]
+
+    selected_items = []
+    for catalog_idx, qty, price, line_total in plan["lines"]:
+        sku, desc, item_currency = catalog[catalog_idx]
+        selected_items.append({
+            "sku": sku,
+            "desc": desc,
+            "qty": qty,
+            "unit_price": price,
+            "total": line_total,
+            "currency": item_currency,
+            "tax_rate": tax_rate,
+        })
+
+    # --- GENERATE PURCHASE ORDER ---
+    po_context = {
+        "po_num": po_num,
+        "date": date_po,
+        "currency": vendor.currency,
+        "vendor": vendor,
+        "buyer": buyer,
+        "items": selected_items,
+        "subtotal": total_po_cost,
+        "tax": plan["tax"],
+        "tax_rate": tax_rate,
+        "grand_total": plan["grand_total"],
+    }
+    generate_pdf(f"{OUTPUT_DIR}/incoming/{po_num}.pdf", po_context, "PO")
+
+    # --- GENERATE GRN ---
+    is_partial = plan["is_partial"]
+    grn_date = date_po + datetime.timedelta(days=plan["grn_delay_days"])
+
+    grn_items = []
+    for item in selected_items:
+        rec_qty = item['qty'] - 1 if (is_partial and item['qty'] > 1) else item['qty']
+        status = 'Accepted' if rec_qty == item['qty'] else 'Partial / Damaged'
+        grn_items.append({
+            "sku": item.get('sku', ''),
+            "desc": item['desc'],
+            "qty": rec_qty,
+            "status": status,
+        })
+
+    grn_context = {
+        "grn_num": f"GR-{po_num[3:]}",
+        "date": grn_date,
+        "ref_po": po_num,
+        "vendor": vendor,
+        "buyer": buyer,
+        "items": grn_items,
+    }
+    generate_pdf(f"{OUTPUT_DIR}/incoming/GRN-{po_num}.pdf", grn_context, "GRN")
+
+    # --- GENERATE INVOICE ---
+    invoice_num = f"INV-{plan['invoice_num']}"
+    invoice_date = date_po + datetime.timedelta(days=plan["invoice_delay_days"])
+
+    chaos_type = plan["chaos_type"]
+
+    inv_items = selected_items.copy()
+    inv_subtotal = plan["inv_subtotal"]
+    inv_po_ref = po_num
+    inv_currency = vendor.currency
+    chaos_note = ""
+
+    if chaos_type == "PRICE_HIKE":
+        markup = plan["markup"]
+        chaos_note = f"Includes unapproved Service Fee: {markup}"
+        inv_items.append({
+            "sku": "",
+            "desc": "Expedited Shipping Fee",
+            "qty": 1,
+            "unit_price": markup,
+            "total": markup,
+            "currency": vendor.currency,
+        })
+
+    elif chaos_type == "GHOST_PO":
+        inv_po_ref = f"PO-{plan['ghost_po_num']}"
+        chaos_note = "System Ref Error: Unknown PO"
+
+    elif chaos_type == "CURRENCY_ERROR":
+        inv_currency = "USD"
+        chaos_note = "Billing Error: Wrong Currency"
+
+    buyer_country = buyer.country
+    buyer_currency = buyer.currency
+
+    inv_context = {
+        "inv_num": invoice_num,
+        "date": invoice_date,
+        "ref_po": inv_po_ref,
+        "vendor": vendor,
+        "buyer": buyer,
+        "currency": inv_currency,
+        "items": inv_items,
+        "subtotal": inv_subtotal,
+        "tax": plan["inv_tax"],
+        "tax_rate": tax_rate,
+        "grand_total": plan["inv_grand_total"],
+        "buyer_country": buyer_country,
+        "buyer_currency": buyer_currency,
+        "note": chaos_note,
+    }
+
+    if plan["fx"] is not None:
+        fx_rate, subtotal_home, tax_home, grand_total_home = plan["fx"]
+        inv_context.update({
+            "home_currency": buyer_currency,
+            "fx_rate": fx_rate,
+            "subtotal_home": subtotal_home,
+            "tax_home": tax_home,
+            "grand_total_home": grand_total_home,
+        })
+
+    generate_pdf(f"{OUTPUT_DIR}/incoming/{invoice_num}.pdf", inv_context, "INV")
+
+
+def generate_dataset(seed=None):
+    print(f"Generating {NUM_TRANSACTIONS} ReportLab PDF transaction sets...")
+
+    # Ensure output directories exist
+    os.makedirs(f"{OUTPUT_DIR}/incoming", exist_ok=True)
+
+    # Register fonts before starting the pool so forked workers inherit
+    # them instead of each re-parsing the TTF
+    _ensure_fonts()
+
+    # All random data is drawn for the whole batch up front, so workers only
+    # render and need no RNG state of their own
+    rng = np.random.default_rng(seed)
+    plans = draw_transactions(rng, NUM_TRANSACTIONS)
 
-        if apply_fx:
-            vendor_to_usd = FX_RATES_TO_HOME.get(vendor['currency'], 1.0)
-            buyer_to_usd = FX_RATES_TO_HOME.get(buyer_currency, 1.0)
-            fx_rate = vendor_to_usd / buyer_to_usd if buyer_to_usd else 1.0
-            subtotal_home = inv_subtotal * fx_rate
-            tax_home = tax * fx_rate
-            grand_total_home = (inv_subtotal + tax) * fx_rate
-            inv_context.update({
-                "home_currency": buyer_currency,
-                "fx_rate": fx_rate,
-                "subtotal_home": subtotal_home,
-                "tax_home": tax_home,
-                "grand_total_home": grand_total_home,
-            })
-
-        generate_pdf(f"{OUTPUT_DIR}/incoming/{invoice_num}.pdf", inv_context, "INV")
+    chunksize = max(1, min(8, NUM_TRANSACTIONS // NUM_WORKERS))
+    with multiprocessing.Pool(processes=NUM_WORKERS, initializer=_ensure_fonts) as pool:
+        for _ in pool.imap_unordered(generate_transaction, plans, chunksize=chunksize):
+            pass
 
     print(f"Done! Created data in '{OUTPUT_DIR}'")
 
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import os
+from collections import defaultdict
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
 from bson import ObjectId
+import orjson
 from pydantic import BaseModel
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -18,10 +22,39 @@ BASE_DIR = Path(__file__).resolve().parent
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB = os.getenv("MONGO_DB", "ema")
 
-client = MongoClient(MONGO_URI)
+# Reconciliation responses are large and compress well; prefer zstd when
+# its library is installed, otherwise fall back to the stdlib zlib
+MONGO_COMPRESSORS = (
+    "zstd,zlib" if importlib.util.find_spec("zstandard") else "zlib"
+)
+
+# Async driver so queries don't block the event loop
+client = AsyncMongoClient(
+    MONGO_URI,
+    compressors=MONGO_COMPRESSORS,
+    maxPoolSize=50,
+    minPoolSize=10,
+    maxIdleTimeMS=60000,
+    socketTimeoutMS=30000,
+    retryReads=True,
+)
 db = client[MONGO_DB]
 
-app = FastAPI(title="Procure Match")
+
+class MongoJSONResponse(Response):
+    """JSON response encoded by orjson, rendering ObjectIds as strings.
+
+    Endpoints return this directly with raw Mongo documents, so no per-document
+    conversion or jsonable_encoder pass is needed.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+app = FastAPI(title="Procure Match", default_response_class=MongoJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,72 +67,180 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
 
 
-def _serialize_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
-    doc = dict(doc)
-    if "_id" in doc and isinstance(doc["_id"], ObjectId):
-        doc["_id"] = str(doc["_id"])
-    return doc
+# Largest invoice/PO grand_total difference still treated as a match
+AMOUNT_TOLERANCE = 0.01
+
+
+async def _aggregate(coll: Any, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cursor = await coll.aggregate(pipeline)
+    return await cursor.to_list()
+
+
+def _orphan_pipeline(ref_field: str) -> List[Dict[str, Any]]:
+    """Aggregation selecting documents whose PO reference is missing or unknown."""
+    return [
+        {"$lookup": {
+            "from": "purchase_orders",
+            "localField": ref_field,
+            "foreignField": "purchase_order.po_number",
+            # Only existence matters, so join at most one bare _id per
+            # document instead of the full PO (MongoDB 5.0+)
+            "pipeline": [{"$project": {"_id": 1}}, {"$limit": 1}],
+            "as": "po",
+        }},
+        {"$match": {"$or": [
+            {"po": {"$size": 0}},
+            {ref_field: {"$in": [None, ""]}},
+        ]}},
+        {"$project": {"po": 0}},
+    ]
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+async def _paginate(
+    coll_name: str, doc_field: str, sort_field: str, limit: int, cursor: Optional[str]
+) -> Response:
+    """Return one page of ``coll_name`` ordered by ``doc_field.sort_field``.
+
+    Only the document body and its source PDF path are projected. The cursor
+    is the last row's JSON-encoded sort key and ``_id`` (so equal keys are not
+    skipped). Rows without a sort key come first, so a null key continues
+    with the rest of that group and then every keyed row.
+    """
+    sort_key = f"{doc_field}.{sort_field}"
+    query: Dict[str, Any] = {}
+    if cursor:
+        encoded_key, _, last_id = cursor.rpartition("|")
+        try:
+            last_key = orjson.loads(encoded_key)
+        except orjson.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not ObjectId.is_valid(last_id) or not isinstance(last_key, (str, type(None))):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if last_key is None:
+            query = {"$or": [
+                {sort_key: None, "_id": {"$gt": ObjectId(last_id)}},
+                {sort_key: {"$ne": None}},
+            ]}
+        else:
+            query = {"$or": [
+                {sort_key: {"$gt": last_key}},
+                {sort_key: last_key, "_id": {"$gt": ObjectId(last_id)}},
+            ]}
+
+    docs = await (
+        db[coll_name]
+        .find(query, {doc_field: 1, "source_pdf_path": 1})
+        .sort([(sort_key, 1), ("_id", 1)])
+        .limit(limit)
+        .to_list()
+    )
+
+    next_cursor = None
+    if len(docs) == limit:
+        last = docs[-1]
+        last_key = (last.get(doc_field) or {}).get(sort_field)
+        next_cursor = f"{orjson.dumps(last_key).decode()}|{last['_id']}"
+
+    return MongoJSONResponse({"items": docs, "next_cursor": next_cursor})
 
 
 @app.get("/api/invoices")
-async def list_invoices() -> List[Dict[str, Any]]:
-    coll = db["invoices"]
-    docs = [
-        _serialize_doc(doc)
-        for doc in coll.find().sort("invoice.invoice_number")
-    ]
-    return docs
+async def list_invoices(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
+    return await _paginate("invoices", "invoice", "invoice_number", limit, cursor)
 
 
 @app.get("/api/purchase_orders")
-async def list_purchase_orders() -> List[Dict[str, Any]]:
-    coll = db["purchase_orders"]
-    docs = [
-        _serialize_doc(doc)
-        for doc in coll.find().sort("purchase_order.po_number")
-    ]
-    return docs
+async def list_purchase_orders(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
+    return await _paginate("purchase_orders", "purchase_order", "po_number", limit, cursor)
 
 
 @app.get("/api/goods_receipts")
-async def list_goods_receipts() -> List[Dict[str, Any]]:
-    coll = db["goods_receipts"]
-    docs = [
-        _serialize_doc(doc)
-        for doc in coll.find().sort("goods_receipt.grn_number")
-    ]
-    return docs
+async def list_goods_receipts(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Response:
+    return await _paginate("goods_receipts", "goods_receipt", "grn_number", limit, cursor)
 
 
 @app.get("/api/reconciliation")
-async def reconciliation() -> List[Dict[str, Any]]:
+async def reconciliation() -> Response:
     po_coll = db["purchase_orders"]
     inv_coll = db["invoices"]
     grn_coll = db["goods_receipts"]
-    decision_coll = db["reconciliation_decisions"]
 
     results: List[Dict[str, Any]] = []
     processed_po_numbers = set()
 
-    # Process all POs and their linked documents
-    for po in po_coll.find():
-        po_s = _serialize_doc(po)
-        po_data = po_s.get("purchase_order") or {}
+    # Join each PO with its invoices, GRNs and decision in one round-trip
+    pipeline = [
+        {"$match": {"purchase_order.po_number": {"$nin": [None, ""]}}},
+        {"$lookup": {
+            "from": "invoices",
+            "localField": "purchase_order.po_number",
+            "foreignField": "invoice.reference_po",
+            "as": "invoices",
+        }},
+        {"$lookup": {
+            "from": "goods_receipts",
+            "localField": "purchase_order.po_number",
+            "foreignField": "goods_receipt.reference_po",
+            "as": "goods_receipts",
+        }},
+        {"$lookup": {
+            "from": "reconciliation_decisions",
+            "localField": "purchase_order.po_number",
+            "foreignField": "po_number",
+            "as": "decision",
+        }},
+        # Compare invoice totals against the PO total server-side
+        {"$addFields": {"mismatched_totals": {"$map": {
+            "input": {"$filter": {
+                "input": "$invoices",
+                "as": "inv",
+                "cond": {"$and": [
+                    {"$ne": ["$$inv.invoice.grand_total", None]},
+                    {"$gt": [
+                        {"$abs": {"$subtract": [
+                            "$$inv.invoice.grand_total", "$purchase_order.grand_total",
+                        ]}},
+                        AMOUNT_TOLERANCE,
+                    ]},
+                ]},
+            }},
+            "as": "inv",
+            "in": "$$inv.invoice.grand_total",
+        }}}},
+    ]
+
+    # The PO join and the two orphan scans (left-joining GRNs and invoices
+    # to POs, keeping those without one or with no PO reference at all)
+    # are independent, so run them concurrently
+    po_rows, orphan_grn_docs, orphan_inv_docs = await asyncio.gather(
+        _aggregate(po_coll, pipeline),
+        _aggregate(grn_coll, _orphan_pipeline("goods_receipt.reference_po")),
+        _aggregate(inv_coll, _orphan_pipeline("invoice.reference_po")),
+    )
+
+    for joined in po_rows:
+        invoices = joined.pop("invoices")
+        grns = joined.pop("goods_receipts")
+        decisions = joined.pop("decision")
+        mismatched_totals = joined.pop("mismatched_totals")
+        po_data = joined.get("purchase_order") or {}
         po_number = po_data.get("po_number")
-        if not po_number:
-            continue
 
         processed_po_numbers.add(po_number)
 
-        invoices = [
-            _serialize_doc(d)
-            for d in inv_coll.find({"invoice.reference_po": po_number})
-        ]
-        grns = [
-            _serialize_doc(d)
-            for d in grn_coll.find({"goods_receipt.reference_po": po_number})
-        ]
-
         status = "matched"
         issues: List[str] = []
 
@@ -110,26 +251,18 @@ async def reconciliation() -> List[Dict[str, Any]]:
             status = "missing_goods_receipt" if status == "matched" else status
             issues.append("No goods receipt found for this PO")
 
-        inv_totals = [
-            (d.get("invoice") or {}).get("grand_total")
-            for d in invoices
-        ]
-        inv_totals = [t for t in inv_totals if t is not None]
-
         po_total = po_data.get("grand_total")
-        if po_total is not None and inv_totals:
-            for t in inv_totals:
-                if abs(t - po_total) > 0.01:
-                    if status == "matched":
-                        status = "amount_mismatch"
-                    issues.append(
-                        f"Invoice grand_total {t} does not match PO grand_total {po_total}"
-                    )
+        for t in mismatched_totals:
+            if status == "matched":
+                status = "amount_mismatch"
+            issues.append(
+                f"Invoice grand_total {t} does not match PO grand_total {po_total}"
+            )
 
         # Check for existing decision
-        decision_doc = decision_coll.find_one({"po_number": po_number})
         decision_info = None
-        if decision_doc:
+        if decisions:
+            decision_doc = decisions[0]
             decision_info = {
                 "decision": decision_doc.get("decision"),
                 "comment": decision_doc.get("comment", ""),
@@ -138,7 +271,7 @@ async def reconciliation() -> List[Dict[str, Any]]:
             }
 
         result = {
-            "po": po_s,
+            "po": joined,
             "invoices": invoices,
             "goods_receipts": grns,
             "status": status,
@@ -147,38 +280,35 @@ async def reconciliation() -> List[Dict[str, Any]]:
         }
         results.append(result)
 
+    ghost_grns_by_po: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for grn in orphan_grn_docs:
+        ref_po = (grn.get("goods_receipt") or {}).get("reference_po")
+        if ref_po:
+            ghost_grns_by_po[ref_po].append(grn)
+
     # Find orphaned invoices (invoices without matching PO)
-    for inv in inv_coll.find():
-        inv_s = _serialize_doc(inv)
-        inv_data = inv_s.get("invoice") or {}
+    for inv in orphan_inv_docs:
+        inv_data = inv.get("invoice") or {}
         ref_po = inv_data.get("reference_po")
         
-        # If invoice references a PO that doesn't exist or wasn't processed
+        # If invoice references a PO that doesn't exist
         if ref_po and ref_po not in processed_po_numbers:
-            # Check if this PO actually exists
-            po_exists = po_coll.find_one({"purchase_order.po_number": ref_po})
-            if not po_exists:
-                # Ghost invoice - references non-existent PO
-                grns = [
-                    _serialize_doc(d)
-                    for d in grn_coll.find({"goods_receipt.reference_po": ref_po})
-                ]
-                
-                result = {
-                    "po": {"purchase_order": {"po_number": ref_po, "vendor": {"name": "Unknown"}}},
-                    "invoices": [inv_s],
-                    "goods_receipts": grns,
-                    "status": "ghost_po",
-                    "issues": [f"Invoice references non-existent PO: {ref_po}"],
-                    "decision": None,
-                }
-                results.append(result)
-                processed_po_numbers.add(ref_po)
+            # Ghost invoice - references non-existent PO
+            result = {
+                "po": {"purchase_order": {"po_number": ref_po, "vendor": {"name": "Unknown"}}},
+                "invoices": [inv],
+                "goods_receipts": ghost_grns_by_po.get(ref_po, []),
+                "status": "ghost_po",
+                "issues": [f"Invoice references non-existent PO: {ref_po}"],
+                "decision": None,
+            }
+            results.append(result)
+            processed_po_numbers.add(ref_po)
         elif not ref_po:
             # Invoice with no PO reference at all
             result = {
                 "po": {"purchase_order": {"po_number": inv_data.get("invoice_number", "Unknown"), "vendor": {"name": inv_data.get("vendor", {}).get("name", "Unknown")}}},
-                "invoices": [inv_s],
+                "invoices": [inv],
                 "goods_receipts": [],
                 "status": "orphaned_invoice",
                 "issues": ["Invoice has no PO reference"],
@@ -187,39 +317,36 @@ async def reconciliation() -> List[Dict[str, Any]]:
             results.append(result)
 
     # Find orphaned GRNs (GRNs without matching PO)
-    for grn in grn_coll.find():
-        grn_s = _serialize_doc(grn)
-        grn_data = grn_s.get("goods_receipt") or {}
+    for grn in orphan_grn_docs:
+        grn_data = grn.get("goods_receipt") or {}
         ref_po = grn_data.get("reference_po")
         
-        # If GRN references a PO that doesn't exist or wasn't processed
+        # If GRN references a PO that doesn't exist
         if ref_po and ref_po not in processed_po_numbers:
-            po_exists = po_coll.find_one({"purchase_order.po_number": ref_po})
-            if not po_exists:
-                # Ghost GRN - references non-existent PO
-                result = {
-                    "po": {"purchase_order": {"po_number": ref_po, "vendor": {"name": "Unknown"}}},
-                    "invoices": [],
-                    "goods_receipts": [grn_s],
-                    "status": "ghost_po",
-                    "issues": [f"GRN references non-existent PO: {ref_po}"],
-                    "decision": None,
-                }
-                results.append(result)
-                processed_po_numbers.add(ref_po)
+            # Ghost GRN - references non-existent PO
+            result = {
+                "po": {"purchase_order": {"po_number": ref_po, "vendor": {"name": "Unknown"}}},
+                "invoices": [],
+                "goods_receipts": [grn],
+                "status": "ghost_po",
+                "issues": [f"GRN references non-existent PO: {ref_po}"],
+                "decision": None,
+            }
+            results.append(result)
+            processed_po_numbers.add(ref_po)
         elif not ref_po:
             # GRN with no PO reference
             result = {
                 "po": {"purchase_order": {"po_number": grn_data.get("grn_number", "Unknown"), "vendor": {"name": grn_data.get("vendor", {}).get("name", "Unknown")}}},
                 "invoices": [],
-                "goods_receipts": [grn_s],
+                "goods_receipts": [grn],
                 "status": "orphaned_grn",
                 "issues": ["GRN has no PO reference"],
                 "decision": None,
             }
             results.append(result)
 
-    return results
+    return MongoJSONResponse(results)
 
 
 @app.get("/api/pdf")
@@ -264,7 +391,7 @@ async def save_reconciliation_decision(decision: ReconciliationDecision) -> Dict
     }
     
     # Upsert: update if exists, insert if not
-    result = reconciliation_coll.update_one(
+    result = await reconciliation_coll.update_one(
         {"po_number": decision.po_number},
         {"$set": decision_record},
         upsert=True
@@ -17,12 +17,29 @@ async function fetchJSON(url) {
   }
 }
 
+// Largest page the list endpoints serve (MAX_PAGE_SIZE in app.py)
+const PAGE_SIZE = 1000;
+
+// List endpoints are paginated; follow next_cursor until exhausted
+async function fetchAllPages(url) {
+  const items = [];
+  let cursor = null;
+  do {
+    const query = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+    const page = await fetchJSON(`${url}?limit=${PAGE_SIZE}${query}`);
+    if (!page.items) return items;
+    items.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return items;
+}
+
 async function updateAnalytics() {
   try {
     const [poData, invData, grnData, reconData] = await Promise.all([
-      fetchJSON("/api/purchase_orders"),
-      fetchJSON("/api/invoices"),
-      fetchJSON("/api/goods_receipts"),
+      fetchAllPages("/api/purchase_orders"),
+      fetchAllPages("/api/invoices"),
+      fetchAllPages("/api/goods_receipts"),
       fetchJSON("/api/reconciliation")
     ]);
 
@@ -446,7 +463,7 @@ async function renderInvoices() {
   updateHeader("Invoices", "...");
   renderEmptyState("list-panel", "Loading invoices...");
   
-  const data = await fetchJSON("/api/invoices");
+  const data = await fetchAllPages("/api/invoices");
   updateHeader("Invoices", data.length);
   if (!data.length) return renderEmptyState("list-panel", "No invoices found.");
 
@@ -528,7 +545,7 @@ async function renderPO() {
   updateHeader("Purchase Orders", "...");
   renderEmptyState("list-panel", "Loading POs...");
 
-  const data = await fetchJSON("/api/purchase_orders");
+  const data = await fetchAllPages("/api/purchase_orders");
   updateHeader("Purchase Orders", data.length);
   if (!data.length) return renderEmptyState("list-panel", "No POs found.");
 
@@ -607,7 +624,7 @@ async function renderGRN() {
   updateHeader("Goods Receipts", "...");
   renderEmptyState("list-panel", "Loading GRNs...");
 
-  const data = await fetchJSON("/api/goods_receipts");
+  const data = await fetchAllPages("/api/goods_receipts");
   updateHeader("Goods Receipts", data.length);
   if (!data.length) return renderEmptyState("list-panel", "No GRNs found.");
 
@@ -1,18 +1,104 @@
 import argparse
 import os
+import queue
 import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
 
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 
 from processor import InvoicePOGRNClassifier, DocumentType
 
 
+COLLECTION_MAP: Dict[DocumentType, str] = {
+    DocumentType.INVOICE: "invoices",
+    DocumentType.PURCHASE_ORDER: "purchase_orders",
+    DocumentType.GOODS_RECEIPT: "goods_receipts",
+}
+
+FOLDER_MAP: Dict[DocumentType, str] = {
+    DocumentType.INVOICE: "invoices",
+    DocumentType.PURCHASE_ORDER: "purchase_orders",
+    DocumentType.GOODS_RECEIPT: "goods_receipts",
+}
+
+# Documents buffered per collection before each insert_many
+INSERT_BATCH_SIZE = 100
+
+
 def iter_pdf_files(root: Path):
-    for path in root.rglob("*.pdf"):
-        if path.is_file():
-            yield path
+    # os.scandir reuses each DirEntry's cached type instead of stat-ing
+    # every path again the way rglob + is_file would
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".pdf") and entry.is_file():
+                    yield Path(entry.path)
+
+
+def walk_in_background(root: Path, maxsize: int = 64) -> Iterator[Path]:
+    """Walk ``root`` for PDFs on a daemon thread, yielding them as they are found.
+
+    The walker blocks when the bounded queue is full. If the walk fails, the
+    error is re-raised here after the PDFs found before it.
+    """
+    paths: "queue.Queue[Union[Path, Exception, None]]" = queue.Queue(maxsize)
+
+    def produce() -> None:
+        try:
+            for path in iter_pdf_files(root):
+                paths.put(path)
+        except Exception as e:  # noqa: BLE001
+            paths.put(e)
+        finally:
+            paths.put(None)
+
+    threading.Thread(target=produce, name="pdf-walker", daemon=True).start()
+    for item in iter(paths.get, None):
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def process_one(
+    classifier: InvoicePOGRNClassifier,
+    data_lake_root: Path,
+    pdf_path: Path,
+) -> Optional[Tuple[str, Dict[str, Any], Path]]:
+    """Classify one PDF and build its Mongo payload without touching the database.
+
+    Returns (collection_name, payload, dest_path), or None if the document
+    type cannot be routed. Classification errors propagate to the caller.
+    """
+    extraction = classifier.classify_pdf(str(pdf_path))
+
+    doc_type = extraction.document_type
+    collection_name = COLLECTION_MAP.get(doc_type)
+    if collection_name is None:
+        print(f"  [WARN] Unknown document type for {pdf_path}: {doc_type}")
+        return None
+
+    # Determine destination folder
+    dest_folder_name = FOLDER_MAP.get(doc_type)
+    if not dest_folder_name:
+        print(f"  [WARN] No folder mapping for {doc_type}")
+        return None
+
+    # Calculate new path in the respective folder
+    dest_folder = data_lake_root.parent / dest_folder_name
+    dest_folder.mkdir(parents=True, exist_ok=True)
+    dest_path = dest_folder / pdf_path.name
+
+    payload = extraction.model_dump()
+    payload["source_pdf_path"] = str(dest_path)  # Store final path, not incoming path
+    return collection_name, payload, dest_path
 
 
 def main() -> None:
@@ -49,6 +135,12 @@ def main() -> None:
         default=None,
         help="Optional limit on number of PDFs to process (for testing).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help="Number of PDFs classified concurrently (default: 16).",
+    )
 
     args = parser.parse_args()
 
@@ -69,101 +161,137 @@ def main() -> None:
     po_coll.create_index("source_pdf_path", unique=True, sparse=True)
     grn_coll.create_index("source_pdf_path", unique=True, sparse=True)
 
+    # Reconciliation joins on these fields alone, so index them as single
+    # keys (the old compound indexes led with document_type and were unusable)
+    for coll, legacy_index in (
+        (invoices_coll, "document_type_1_invoice.reference_po_1"),
+        (po_coll, "document_type_1_purchase_order.po_number_1"),
+        (grn_coll, "document_type_1_goods_receipt.reference_po_1"),
+    ):
+        if legacy_index in coll.index_information():
+            coll.drop_index(legacy_index)
+
     # invoice.reference_po ties invoice back to PO
-    invoices_coll.create_index([
-        ("document_type", 1),
-        ("invoice.reference_po", 1),
-    ])
+    invoices_coll.create_index("invoice.reference_po")
 
-    # purchase_order.po_number is the canonical PO identifier
-    po_coll.create_index([
-        ("document_type", 1),
-        ("purchase_order.po_number", 1),
-    ])
+    # purchase_order.po_number is the canonical PO identifier. Not unique:
+    # existing data may repeat PO numbers, and a unique index would fail to
+    # build there and reject every later PDF that collides. An earlier
+    # unique version of the index is replaced.
+    po_number_index = po_coll.index_information().get("purchase_order.po_number_1")
+    if po_number_index is not None and po_number_index.get("unique"):
+        po_coll.drop_index("purchase_order.po_number_1")
+    po_coll.create_index("purchase_order.po_number")
 
     # goods_receipt.reference_po ties GRN back to PO
-    grn_coll.create_index([
-        ("document_type", 1),
-        ("goods_receipt.reference_po", 1),
-    ])
-
-    collection_map: Dict[DocumentType, str] = {
-        DocumentType.INVOICE: "invoices",
-        DocumentType.PURCHASE_ORDER: "purchase_orders",
-        DocumentType.GOODS_RECEIPT: "goods_receipts",
-    }
-    
-    folder_map: Dict[DocumentType, str] = {
-        DocumentType.INVOICE: "invoices",
-        DocumentType.PURCHASE_ORDER: "purchase_orders",
-        DocumentType.GOODS_RECEIPT: "goods_receipts",
-    }
+    grn_coll.create_index("goods_receipt.reference_po")
+
+    # po_number is the join key for reconciliation decisions (one per PO)
+    db["reconciliation_decisions"].create_index("po_number", unique=True)
 
-    classifier = InvoicePOGRNClassifier()
+    classifier = InvoicePOGRNClassifier(cache_collection=db["classification_cache"])
+
+    # Load every already-indexed path once instead of querying per PDF
+    seen = set()
+    for coll in (invoices_coll, po_coll, grn_coll):
+        seen.update(
+            d["source_pdf_path"]
+            for d in coll.find(
+                {"source_pdf_path": {"$exists": True}},
+                {"source_pdf_path": 1, "_id": 0},
+            )
+        )
 
     processed = 0
     skipped = 0
     moved = 0
     
-    for pdf_path in iter_pdf_files(data_lake_root):
-        if args.limit is not None and processed >= args.limit:
-            break
-            
-        pdf_path_str = str(pdf_path)
-        
-        # Check if this PDF has already been processed in any collection
-        already_exists = (
-            invoices_coll.find_one({"source_pdf_path": pdf_path_str}) or
-            po_coll.find_one({"source_pdf_path": pdf_path_str}) or
-            grn_coll.find_one({"source_pdf_path": pdf_path_str})
-        )
-        
-        if already_exists:
-            print(f"Skipping {pdf_path} (already indexed)")
-            skipped += 1
-            continue
-            
-        print(f"Processing {pdf_path}...")
+    def pending_pdfs():
+        nonlocal skipped
+        submitted = 0
+        for pdf_path in walk_in_background(data_lake_root):
+            if args.limit is not None and submitted >= args.limit:
+                return
+
+            # Check if this PDF has already been processed in any collection
+            if str(pdf_path) in seen:
+                print(f"Skipping {pdf_path} (already indexed)")
+                skipped += 1
+                continue
+
+            print(f"Processing {pdf_path}...")
+            submitted += 1
+            yield pdf_path
+
+    # Payloads waiting to be inserted, per collection: (pdf_path, dest_path, payload)
+    buffers: Dict[str, List[Tuple[Path, Path, Dict[str, Any]]]] = {
+        name: [] for name in COLLECTION_MAP.values()
+    }
+
+    def flush(collection_name: str) -> None:
+        nonlocal processed, moved
+        batch = buffers[collection_name]
+        if not batch:
+            return
+        buffers[collection_name] = []
+
+        # Unordered so one duplicate (unique source_pdf_path) doesn't stop the rest
+        failed: Dict[int, str] = {}
         try:
-            extraction = classifier.classify_pdf(pdf_path_str)
+            db[collection_name].insert_many([p for _, _, p in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "") for err in e.details.get("writeErrors", [])}
         except Exception as e:  # noqa: BLE001
-            print(f"  [ERROR] Failed to classify {pdf_path}: {e}")
-            continue
-
-        doc_type = extraction.document_type
-        collection_name = collection_map.get(doc_type)
-        if collection_name is None:
-            print(f"  [WARN] Unknown document type for {pdf_path}: {doc_type}")
-            continue
-
-        # Determine destination folder
-        dest_folder_name = folder_map.get(doc_type)
-        if not dest_folder_name:
-            print(f"  [WARN] No folder mapping for {doc_type}")
-            continue
-            
-        # Calculate new path in the respective folder
-        dest_folder = data_lake_root.parent / dest_folder_name
-        dest_folder.mkdir(parents=True, exist_ok=True)
-        dest_path = dest_folder / pdf_path.name
-        dest_path_str = str(dest_path)
-
-        payload = extraction.model_dump()
-        payload["source_pdf_path"] = dest_path_str  # Store final path, not incoming path
-
-        collection = db[collection_name]
+            for pdf_path, _, _ in batch:
+                print(f"  [ERROR] Failed to insert {pdf_path}: {e}")
+            return
+        print(f"  Inserted {len(batch) - len(failed)} documents into {collection_name}")
+
+        for index, (pdf_path, dest_path, _) in enumerate(batch):
+            if index in failed:
+                print(f"  [ERROR] Failed to insert {pdf_path}: {failed[index]}")
+                continue
+            try:
+                # Move file to respective folder after successful insertion
+                shutil.move(str(pdf_path), str(dest_path))
+                print(f"  Moved to {dest_path}")
+                moved += 1
+                processed += 1
+            except Exception as e:  # noqa: BLE001
+                print(f"  [ERROR] Failed to move {pdf_path}: {e}")
+
+    def collect(pdf_path: Path, future: Future) -> None:
         try:
-            result = collection.insert_one(payload)
-            print(f"  Inserted into {collection_name} with _id={result.inserted_id}")
-            
-            # Move file to respective folder after successful insertion
-            shutil.move(str(pdf_path), str(dest_path))
-            print(f"  Moved to {dest_path}")
-            moved += 1
-            processed += 1
+            outcome = future.result()
         except Exception as e:  # noqa: BLE001
-            print(f"  [ERROR] Failed to insert/move {pdf_path}: {e}")
-            continue
+            print(f"  [ERROR] Failed to classify {pdf_path}: {e}")
+            return
+        if outcome is None:
+            return
+        collection_name, payload, dest_path = outcome
+
+        batch = buffers[collection_name]
+        batch.append((pdf_path, dest_path, payload))
+        if len(batch) >= INSERT_BATCH_SIZE:
+            flush(collection_name)
+
+    # Classification is dominated by OpenAI latency, so run it on a thread
+    # pool; batched database writes and file moves stay on this thread.
+    # Results are collected in submission order while the walk continues,
+    # with at most two PDFs per worker in flight.
+    in_flight: Deque[Tuple[Path, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for pdf_path in pending_pdfs():
+            in_flight.append(
+                (pdf_path, executor.submit(process_one, classifier, data_lake_root, pdf_path))
+            )
+            if len(in_flight) >= 2 * args.workers:
+                collect(*in_flight.popleft())
+        while in_flight:
+            collect(*in_flight.popleft())
+
+    for collection_name in buffers:
+        flush(collection_name)
 
     print(f"Done. Total PDFs processed: {processed}, moved: {moved}, skipped: {skipped}")
 
@@ -1,7 +1,7 @@
 """
 document_classifier.py
 
-- Converts a PDF to high-res images (300 DPI).
+- Renders PDF pages to JPEG in memory with PDFium (Poppler as a fallback).
 - Encodes images to Base64.
 - Sends payload to GPT-4o via Chat Completions API.
 - Uses 'client.beta.chat.completions.parse' for direct Pydantic extraction.
@@ -9,15 +9,35 @@ document_classifier.py
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import hashlib
+import io
+import logging
+import os
 import re
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Any, Callable, ClassVar, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Union
 
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from openai import OpenAI
+from openai import AsyncOpenAI, BadRequestError, OpenAI
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # Optional: rendering falls back to Poppler via pdf2image
+    pdfium = None
+
+try:
+    import pybase64
+except ImportError:  # Optional: SIMD base64, falls back to the stdlib encoder
+    pybase64 = None
 
 # ============================================================
 # Pydantic Models (Strict Mode Compliant)
@@ -28,13 +48,17 @@ class DocumentType(str, Enum):
     PURCHASE_ORDER = "purchase_order"
     GOODS_RECEIPT = "goods_receipt_note"
 
+_PO_RE = re.compile(r"PO-\d+")
+
 def _normalize_po_reference(value: Optional[str]) -> Optional[str]:
     if value is None:
         return None
     text = value.strip()
-    match = re.search(r"(PO-\d+)", text)
+    if "PO-" not in text:
+        return text
+    match = _PO_RE.search(text)
     if match:
-        return match.group(1)
+        return match.group(0)
     return text
 
 class Party(BaseModel):
@@ -118,20 +142,311 @@ class DocumentExtractionResult(BaseModel):
             return self.goods_receipt
         return None
 
+class DocumentTypeResult(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    document_type: DocumentType
+
+# Type-specialized schema, and the DocumentExtractionResult field it fills
+TYPED_SCHEMAS = {
+    DocumentType.INVOICE: ("invoice", InvoiceModel),
+    DocumentType.PURCHASE_ORDER: ("purchase_order", PurchaseOrderModel),
+    DocumentType.GOODS_RECEIPT: ("goods_receipt", GoodsReceiptModel),
+}
+
+def _typed_result(
+    document_type: DocumentType,
+    document: Union[InvoiceModel, PurchaseOrderModel, GoodsReceiptModel, None],
+) -> Optional[DocumentExtractionResult]:
+    """Wraps a type-specialized extraction as a DocumentExtractionResult."""
+    if document is None:
+        return None
+    fields = {field: None for field, _ in TYPED_SCHEMAS.values()}
+    fields[TYPED_SCHEMAS[document_type][0]] = document
+    return DocumentExtractionResult(document_type=document_type, **fields)
+
+class BatchDocumentExtractionResult(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    documents: List[DocumentExtractionResult] = Field(..., description="One result per document, in input order")
+
+# ============================================================
+# PDF Rendering Backends
+# ============================================================
+
+class _PopplerDocument:
+    """Renders pages with Poppler's command-line tools via pdf2image.
+
+    Every render is its own subprocess, so pages can be rendered from
+    several threads at once.
+    """
+
+    concurrent = True
+
+    def __init__(self, pdf_path: str, poppler_path: Optional[str] = None) -> None:
+        self.pdf_path = pdf_path
+        self.poppler_path = poppler_path
+        self.page_count = pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"]
+
+    def render(self, page_index: int, dpi: int) -> Image.Image:
+        page_number = page_index + 1
+        return convert_from_path(
+            self.pdf_path,
+            dpi=dpi,
+            first_page=page_number,
+            last_page=page_number,
+            fmt="jpeg",
+            use_pdftocairo=True,
+            poppler_path=self.poppler_path,
+        )[0]
+
+    def close(self) -> None:
+        pass
+
+# PDFium's library state is global and not thread-safe, so every call into
+# it (across all documents) is serialized
+_PDFIUM_LOCK = threading.Lock()
+
+class _PdfiumDocument:
+    """Renders pages in-process with PDFium (pypdfium2).
+
+    PDFium is not thread-safe, so pages are rendered one at a time.
+    """
+
+    concurrent = False
+
+    def __init__(self, pdf_path: str) -> None:
+        with _PDFIUM_LOCK:
+            self.pdf = pdfium.PdfDocument(pdf_path)
+            self.page_count = len(self.pdf)
+
+    def render(self, page_index: int, dpi: int) -> Image.Image:
+        with _PDFIUM_LOCK:
+            page = self.pdf[page_index]
+            try:
+                bitmap = page.render(scale=dpi / 72)
+                image = bitmap.to_pil()
+                bitmap.close()
+                return image
+            finally:
+                page.close()
+
+    def close(self) -> None:
+        with _PDFIUM_LOCK:
+            self.pdf.close()
+
+PDF_BACKENDS = ("auto", "pdfium", "poppler")
+
+# Default location for on-disk classification results (used by the CLI)
+DEFAULT_CACHE_DIR = Path("~/.cache/autoprocure/classify")
+
+EXTRACT_INSTRUCTION = "Analyze this document image. Extract all fields strictly according to the schema."
+TYPE_INSTRUCTION = "Analyze this document image. Identify the document type only."
+
+# Relative resolution of the images sent to the type-only first stage
+TYPE_STAGE_SCALE = 0.5
+
+# Longest edge, in pixels, of page images sent to the API
+IMAGE_MAX_DIM = 1536
+
+# Grey level below which a pixel counts as page content when cropping away
+# blank margins, and the margin (in rendered pixels) kept around it
+CONTENT_THRESHOLD = 240
+CROP_PADDING = 16
+
+# Retries for rate limits, timeouts and connection errors on default clients;
+# the SDK backs off exponentially (honouring Retry-After) and logs each wait
+MAX_API_RETRIES = 6
+
+# Process-wide sync client shared by classifiers that aren't given one, so
+# they reuse one connection pool (and its TLS sessions). The async client
+# isn't shared: its connections are bound to the event loop that opened them.
+_DEFAULT_CLIENT: Optional[OpenAI] = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+
+def _get_default_client() -> OpenAI:
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = OpenAI(max_retries=MAX_API_RETRIES)
+        return _DEFAULT_CLIENT
+
+logger = logging.getLogger(__name__)
+
+
+def _b64encode_str(data: bytes | memoryview) -> str:
+    """Base64-encodes ``data`` to a str, with pybase64 when it's installed."""
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode("ascii")
+
+
+def _crop_to_content(image: Image.Image) -> Image.Image:
+    """Crops the blank margins around a page's content, keeping a little padding."""
+    mask = image.convert("L").point(lambda p: 255 if p < CONTENT_THRESHOLD else 0)
+    bbox = mask.getbbox()
+    if bbox is None:  # Blank page
+        return image
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - CROP_PADDING),
+        max(0, top - CROP_PADDING),
+        min(image.width, right + CROP_PADDING),
+        min(image.height, bottom + CROP_PADDING),
+    ))
+
+
+def _parsed_document_type(completion: Any) -> DocumentType:
+    """Document type from a first-stage (DocumentTypeResult) completion."""
+    parsed = completion.choices[0].message.parsed
+    if parsed is None:
+        raise RuntimeError("Could not determine the document type.")
+    return parsed.document_type
+
+
+def _is_image_size_error(error: BadRequestError) -> bool:
+    """Whether the API rejected a request because an image was too large."""
+    message = str(error).lower()
+    return "image" in message and any(
+        word in message for word in ("too large", "size", "dimension", "exceed")
+    )
+
 # ============================================================
 # Main Classifier Class (Chat Completion Version)
 # ============================================================
 
 class InvoicePOGRNClassifier:
+    SYSTEM_PROMPT: ClassVar[str] = (
+        "You are an expert procurement document parser (Invoice, PO, GRN).\n"
+        "1. Identify document type ('請求書'=Invoice, '発注書'=PO, '受領書'=GRN).\n"
+        "2. Extract Japanese text exactly.\n"
+        "3. Handle currency: Use main table currency for line items. Note conversions in 'note'.\n"
+        "4. Return null for missing fields."
+        "5. get the buyer total for the buyer's currency. as defined in invoice. if invoice currency is not the buyer's currency"
+    )
+
     def __init__(
         self,
         openai_client: Optional[OpenAI] = None,
         poppler_path: Optional[str] = None,
         model_name: str = "gpt-4o",  # Must be a vision-capable model
+        cache_collection: Optional[Any] = None,
+        cache_dir: Optional[str | Path] = None,
+        pdf_backend: str = "auto",  # "auto" prefers pdfium when installed
+        async_openai_client: Optional[AsyncOpenAI] = None,
     ) -> None:
-        self.client = openai_client or OpenAI()
+        if pdf_backend not in PDF_BACKENDS:
+            raise ValueError(f"pdf_backend must be one of {PDF_BACKENDS}, got {pdf_backend!r}")
+        if pdf_backend == "pdfium" and pdfium is None:
+            raise RuntimeError("pdf_backend='pdfium' requires the pypdfium2 package.")
+        self.client = openai_client or _get_default_client()
+        self._async_client = async_openai_client
         self.poppler_path = poppler_path
+        self.pdf_backend = pdf_backend
         self.model_name = model_name
+        # Identical leading message for every request, so it's built once
+        # (and keeps the prompt prefix stable for OpenAI's prompt caching)
+        self._system_message = {"role": "system", "content": self.SYSTEM_PROMPT}
+        # Optional Mongo collection and/or directory caching results by PDF
+        # content hash
+        self.cache_collection = cache_collection
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir is not None else None
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Async client for ``classify_pdf_async``, created on first use."""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(max_retries=MAX_API_RETRIES)
+        return self._async_client
+
+    def _open_pdf(self, pdf_path: str) -> Union[_PdfiumDocument, _PopplerDocument]:
+        if self.pdf_backend == "poppler" or pdfium is None:
+            return _PopplerDocument(pdf_path, self.poppler_path)
+        return _PdfiumDocument(pdf_path)
+
+    def _pdf_to_pil_pages(
+        self,
+        pdf_path: str | Path,
+        dpi: int = 200,
+        page_indices: Optional[Iterable[int]] = None,
+    ) -> Iterator[Image.Image]:
+        """Yields the PDF's pages as in-memory PIL images, in page order.
+
+        Only the (0-based) ``page_indices`` that exist in the document are
+        rendered; by default, every page is. With a backend that supports it,
+        pages are rendered concurrently and each one is yielded as soon as it
+        is ready, so callers can encode it while later pages render.
+        """
+        doc = self._open_pdf(Path(pdf_path).as_posix())
+        try:
+            if page_indices is None:
+                indices = range(doc.page_count)
+            else:
+                indices = [i for i in page_indices if 0 <= i < doc.page_count]
+
+            if not doc.concurrent or len(indices) <= 1:
+                for page_index in indices:
+                    yield doc.render(page_index, dpi)
+                return
+
+            # Render ahead of the consumer, but only by a bounded number of
+            # pages so long documents don't pile up decoded images in memory
+            workers = min(len(indices), os.cpu_count() or 1)
+            max_pending = 2 * workers
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending: Deque[Future] = deque()
+                for page_index in indices:
+                    if len(pending) >= max_pending:
+                        yield pending.popleft().result()
+                    pending.append(pool.submit(doc.render, page_index, dpi))
+                while pending:
+                    yield pending.popleft().result()
+        finally:
+            doc.close()
+
+    def _pdf_to_page_bytes(
+        self,
+        pdf_path: str | Path,
+        dpi: int = 200,
+        fmt: str = "JPEG",
+        quality: int = 85,
+        max_dim: Optional[int] = IMAGE_MAX_DIM,
+        page_indices: Optional[Iterable[int]] = None,
+        crop: bool = True,
+    ) -> List[bytes]:
+        """Encodes PDF pages (all, or just ``page_indices``) as ``fmt`` images
+        in memory.
+
+        With ``crop``, blank page margins are cut away first. Pages are then
+        downscaled to fit within ``max_dim`` pixels on their long edge (pass
+        None to keep the rendered size).
+        """
+        save_options = {"quality": quality, "optimize": True} if fmt == "JPEG" else {}
+        encoded: List[bytes] = []
+        for image in self._pdf_to_pil_pages(pdf_path, dpi=dpi, page_indices=page_indices):
+            if crop:
+                image = _crop_to_content(image)
+            if max_dim:
+                image.thumbnail((max_dim, max_dim), Image.LANCZOS)
+            buf = io.BytesIO()
+            image.save(buf, fmt, **save_options)
+            encoded.append(buf.getvalue())
+        return encoded
+
+    def pdf_to_jpeg_base64(
+        self,
+        pdf_path: str | Path,
+        dpi: int = 200,
+        quality: int = 85,
+        max_dim: Optional[int] = IMAGE_MAX_DIM,
+        page_indices: Optional[Iterable[int]] = None,
+    ) -> List[str]:
+        """Encodes PDF pages as Base64 JPEGs without touching the disk."""
+        return [
+            _b64encode_str(page)
+            for page in self._pdf_to_page_bytes(
+                pdf_path, dpi=dpi, quality=quality, max_dim=max_dim, page_indices=page_indices
+            )
+        ]
 
     def pdf_to_images(
         self,
@@ -139,121 +454,407 @@ class InvoicePOGRNClassifier:
         output_dir: str | Path = "tmp_pdf_images",
         dpi: int = 300,
     ) -> List[Path]:
-        """Converts PDF to PNG images at 300 DPI."""
+        """Writes full-size PNGs of every page to ``output_dir``, at 300 DPI by
+        default, for inspecting what the renderer produces. Classification
+        never uses it."""
         pdf_path = Path(pdf_path)
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        pages = convert_from_path(
-            pdf_path.as_posix(),
-            dpi=dpi,
-            poppler_path=self.poppler_path,
-        )
-
         image_paths: List[Path] = []
+        pages = self._pdf_to_page_bytes(pdf_path, dpi=dpi, fmt="PNG", max_dim=None, crop=False)
         for i, page in enumerate(pages):
             image_path = output_dir / f"{pdf_path.stem}_page_{i+1}.png"
-            page.save(image_path.as_posix(), "PNG")
+            image_path.write_bytes(page)
             image_paths.append(image_path)
         return image_paths
 
-    def _encode_image(self, image_path: Path) -> str:
-        """Encodes a local image file to a Base64 string."""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
+    def _cache_file(self, cache_key: Dict[str, Any]) -> Path:
+        return self.cache_dir / (re.sub(r"[^\w.-]", "_", cache_key["_id"]) + ".json")
+
+    def _load_cached(self, cache_key: Dict[str, Any]) -> Optional[DocumentExtractionResult]:
+        if self.cache_dir is not None:
+            try:
+                return DocumentExtractionResult.model_validate_json(
+                    self._cache_file(cache_key).read_bytes()
+                )
+            except (FileNotFoundError, ValueError):
+                pass  # Missing or unreadable entry: treat as a miss
+        if self.cache_collection is not None:
+            cached = self.cache_collection.find_one({"_id": cache_key["_id"]})
+            if cached is not None:
+                return DocumentExtractionResult.model_validate(cached["payload"])
+        return None
 
-    def classify_pdf(
-        self,
-        pdf_path: str | Path,
-        use_first_page_only: bool = True,
-    ) -> DocumentExtractionResult:
-        """
-        Extracts structured data using Chat Completions with Vision + Structured Outputs.
+    def _store_cached(self, cache_key: Dict[str, Any], result: DocumentExtractionResult) -> None:
+        if self.cache_dir is not None:
+            path = self._cache_file(cache_key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so concurrent readers never see partial JSON;
+            # each writer gets its own temp file, removed if anything fails
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix="autoprocure_", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(result.model_dump_json())
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        if self.cache_collection is not None:
+            self.cache_collection.replace_one(
+                {"_id": cache_key["_id"]},
+                {**cache_key, "payload": result.model_dump(mode="json")},
+                upsert=True,
+            )
+
+    def _cache_key(
+        self, pdf_path: str | Path, use_first_page_only: bool, detail: str, two_stage: bool
+    ) -> Optional[Dict[str, Any]]:
+        """Cache key for a PDF's result, or None when caching is disabled.
+
+        ``_id`` combines the PDF's hash with every setting that changes the
+        result, so each combination gets its own entry.
         """
-        # 1. Convert PDF to Image(s)
-        images = self.pdf_to_images(pdf_path, dpi=300)
+        if self.cache_collection is None and self.cache_dir is None:
+            return None
+        pdf_sha256 = hashlib.sha256(Path(pdf_path).read_bytes()).hexdigest()
+        pages = "first" if use_first_page_only else "all"
+        stages = "two" if two_stage else "one"
+        return {
+            "_id": f"{pdf_sha256}-{self.model_name}-{detail}-{pages}-{stages}",
+            "pdf_sha256": pdf_sha256,
+            "model": self.model_name,
+            "first_page_only": use_first_page_only,
+            "detail": detail,
+            "two_stage": two_stage,
+        }
+
+    def _image_content(
+        self, pdf_path: str | Path, use_first_page_only: bool, detail: str, scale: float = 1.0
+    ) -> List[Dict[str, Any]]:
+        """Renders a PDF into ``image_url`` message parts, with the DPI and
+        size cap multiplied by ``scale``."""
+        # Only the pages that will be sent are rendered; a single page only
+        # needs enough resolution for the downscaled image
+        max_dim = int(IMAGE_MAX_DIM * scale)
+        if use_first_page_only:
+            images = self.pdf_to_jpeg_base64(
+                pdf_path, dpi=int(150 * scale), max_dim=max_dim, page_indices=[0]
+            )
+        else:
+            images = self.pdf_to_jpeg_base64(pdf_path, dpi=int(200 * scale), max_dim=max_dim)
         if not images:
             raise RuntimeError("No images generated.")
 
-        # 2. Prepare Message Payload
-        image_paths_to_use = [images[0]] if use_first_page_only else images
-        
-        user_content = []
-        # Add text instruction
-        user_content.append({
-            "type": "text", 
-            "text": "Analyze this document image. Extract all fields strictly according to the schema."
-        })
-
-        # Add base64 images
-        for img_path in image_paths_to_use:
-            base64_image = self._encode_image(img_path)
-            user_content.append({
+        return [
+            {
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/png;base64,{base64_image}"
+                    "url": f"data:image/jpeg;base64,{base64_image}",
+                    "detail": detail,
                 }
-            })
-
-        system_prompt = (
-            "You are an expert procurement document parser (Invoice, PO, GRN).\n"
-            "1. Identify document type ('請求書'=Invoice, '発注書'=PO, '受領書'=GRN).\n"
-            "2. Extract Japanese text exactly.\n"
-            "3. Handle currency: Use main table currency for line items. Note conversions in 'note'.\n"
-            "4. Return null for missing fields."
-            "5. get the buyer total for the buyer's currency. as defined in invoice. if invoice currency is not the buyer's currency"
+            }
+            for base64_image in images
+        ]
+
+    def _messages(
+        self,
+        pdf_path: str | Path,
+        use_first_page_only: bool,
+        detail: str,
+        scale: float = 1.0,
+        instruction: str = EXTRACT_INSTRUCTION,
+    ) -> List[Dict[str, Any]]:
+        """Chat messages asking for one PDF's extraction."""
+        user_content = [{"type": "text", "text": instruction}]
+        user_content.extend(self._image_content(pdf_path, use_first_page_only, detail, scale))
+        return [
+            self._system_message,
+            {"role": "user", "content": user_content},
+        ]
+
+    def _parse(
+        self,
+        build_messages: Callable[[float], List[Dict[str, Any]]],
+        response_format: type[BaseModel],
+        label: Any,
+    ) -> Any:
+        """
+        Calls Chat Completions ``.parse()`` with ``build_messages(1.0)``. If the
+        API rejects the images as too large, retries once with the messages
+        rebuilt at half resolution. Rate limits and connection errors are
+        retried with backoff by the client itself.
+        """
+        try:
+            return self.client.beta.chat.completions.parse(
+                model=self.model_name,
+                messages=build_messages(1.0),
+                response_format=response_format,
+            )
+        except BadRequestError as e:
+            if not _is_image_size_error(e):
+                raise
+            logger.warning("Images rejected for %s (%s); retrying at half resolution", label, e)
+            return self.client.beta.chat.completions.parse(
+                model=self.model_name,
+                messages=build_messages(0.5),
+                response_format=response_format,
+            )
+
+    async def _aparse(
+        self,
+        build_messages: Callable[[float], List[Dict[str, Any]]],
+        response_format: type[BaseModel],
+        label: Any,
+    ) -> Any:
+        """Async ``_parse``; messages are built (rendered) in the default executor."""
+        loop = asyncio.get_running_loop()
+        messages = await loop.run_in_executor(None, build_messages, 1.0)
+        try:
+            return await self.async_client.beta.chat.completions.parse(
+                model=self.model_name,
+                messages=messages,
+                response_format=response_format,
+            )
+        except BadRequestError as e:
+            if not _is_image_size_error(e):
+                raise
+            logger.warning("Images rejected for %s (%s); retrying at half resolution", label, e)
+            messages = await loop.run_in_executor(None, build_messages, 0.5)
+            return await self.async_client.beta.chat.completions.parse(
+                model=self.model_name,
+                messages=messages,
+                response_format=response_format,
+            )
+
+    def _type_stage_messages(
+        self, pdf_path: str | Path, use_first_page_only: bool
+    ) -> Callable[[float], List[Dict[str, Any]]]:
+        return lambda scale: self._messages(
+            pdf_path, use_first_page_only, "low", scale * TYPE_STAGE_SCALE, TYPE_INSTRUCTION
         )
 
-        # 3. Call Chat Completions API with .parse()
-        completion = self.client.beta.chat.completions.parse(
-            model=self.model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content},
-            ],
-            response_format=DocumentExtractionResult,
+    def _typed_stage_messages(
+        self, pdf_path: str | Path, use_first_page_only: bool, detail: str, document_type: DocumentType
+    ) -> Callable[[float], List[Dict[str, Any]]]:
+        instruction = (
+            f"This document is a {document_type.value.replace('_', ' ')}. "
+            "Extract all fields strictly according to the schema."
         )
+        return lambda scale: self._messages(pdf_path, use_first_page_only, detail, scale, instruction)
+
+    def classify_pdf(
+        self,
+        pdf_path: str | Path,
+        use_first_page_only: bool = True,
+        detail: str = "high",
+        two_stage: bool = False,
+    ) -> DocumentExtractionResult:
+        """
+        Extracts structured data using Chat Completions with Vision + Structured Outputs.
+
+        ``detail`` is passed through as the OpenAI image detail level. It
+        defaults to "high" because line items and totals need it; "low" scales
+        each page down to 512 px and only suits coarse fields.
 
-        # 4. Return the parsed Pydantic object
-        # The SDK automatically validates the JSON against the model
-        result = completion.choices[0].message.parsed
-        
-        # Cleanup temp images (optional)
-        # for img in images: img.unlink()
+        With ``two_stage``, a cheap low-detail call first identifies the
+        document type, then a second call extracts against that type's schema
+        only. This trades an extra round-trip for a smaller response schema.
+        """
+        # 0. Reuse a cached result for identical PDF content
+        cache_key = self._cache_key(pdf_path, use_first_page_only, detail, two_stage)
+        if cache_key is not None:
+            cached = self._load_cached(cache_key)
+            if cached is not None:
+                return cached
+
+        # 1-2. Convert PDF to JPEG image(s) and call Chat Completions
+        if two_stage:
+            completion = self._parse(
+                self._type_stage_messages(pdf_path, use_first_page_only),
+                DocumentTypeResult,
+                pdf_path,
+            )
+            document_type = _parsed_document_type(completion)
+            completion = self._parse(
+                self._typed_stage_messages(pdf_path, use_first_page_only, detail, document_type),
+                TYPED_SCHEMAS[document_type][1],
+                pdf_path,
+            )
+            result = _typed_result(document_type, completion.choices[0].message.parsed)
+        else:
+            completion = self._parse(
+                lambda scale: self._messages(pdf_path, use_first_page_only, detail, scale),
+                DocumentExtractionResult,
+                pdf_path,
+            )
+            # 3. Return the parsed Pydantic object
+            # The SDK automatically validates the JSON against the model
+            result = completion.choices[0].message.parsed
+
+        if cache_key is not None and result is not None:
+            self._store_cached(cache_key, result)
+
+        return result
+
+    async def classify_pdf_async(
+        self,
+        pdf_path: str | Path,
+        use_first_page_only: bool = True,
+        detail: str = "high",
+        two_stage: bool = False,
+    ) -> DocumentExtractionResult:
+        """
+        Async ``classify_pdf``: hashing, cache I/O and rendering run in the
+        default executor, so several documents can be prepared while others
+        wait on the API.
+        """
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(
+            None, self._cache_key, pdf_path, use_first_page_only, detail, two_stage
+        )
+        if cache_key is not None:
+            cached = await loop.run_in_executor(None, self._load_cached, cache_key)
+            if cached is not None:
+                return cached
+
+        if two_stage:
+            completion = await self._aparse(
+                self._type_stage_messages(pdf_path, use_first_page_only),
+                DocumentTypeResult,
+                pdf_path,
+            )
+            document_type = _parsed_document_type(completion)
+            completion = await self._aparse(
+                self._typed_stage_messages(pdf_path, use_first_page_only, detail, document_type),
+                TYPED_SCHEMAS[document_type][1],
+                pdf_path,
+            )
+            result = _typed_result(document_type, completion.choices[0].message.parsed)
+        else:
+            completion = await self._aparse(
+                lambda scale: self._messages(pdf_path, use_first_page_only, detail, scale),
+                DocumentExtractionResult,
+                pdf_path,
+            )
+            result = completion.choices[0].message.parsed
+
+        if cache_key is not None and result is not None:
+            await loop.run_in_executor(None, self._store_cached, cache_key, result)
 
         return result
 
+    def _batch_messages(
+        self,
+        pdf_paths: Sequence[str | Path],
+        use_first_page_only: bool,
+        detail: str,
+        scale: float = 1.0,
+    ) -> List[Dict[str, Any]]:
+        """Chat messages asking for several PDFs' extractions in one response."""
+        user_content = [{
+            "type": "text",
+            "text": (
+                f"Analyze these {len(pdf_paths)} documents. Each one starts with a "
+                "'Document N' marker followed by its image(s). Extract all fields "
+                "strictly according to the schema and return one result per "
+                "document, in the same order."
+            ),
+        }]
+        for n, pdf_path in enumerate(pdf_paths, 1):
+            user_content.append({"type": "text", "text": f"Document {n}"})
+            user_content.extend(self._image_content(pdf_path, use_first_page_only, detail, scale))
+        return [
+            self._system_message,
+            {"role": "user", "content": user_content},
+        ]
+
+    def classify_pdfs(
+        self,
+        pdf_paths: Sequence[str | Path],
+        use_first_page_only: bool = True,
+        detail: str = "high",
+        batch_size: int = 10,
+    ) -> List[DocumentExtractionResult]:
+        """
+        Extracts several PDFs, packing up to ``batch_size`` documents into
+        each request so the system prompt and round-trip are paid once per
+        batch. Cached documents are returned without an API call.
+        """
+        results: List[Optional[DocumentExtractionResult]] = [None] * len(pdf_paths)
+        misses = []
+        for i, pdf_path in enumerate(pdf_paths):
+            cache_key = self._cache_key(pdf_path, use_first_page_only, detail, False)
+            cached = self._load_cached(cache_key) if cache_key is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append((i, cache_key))
+
+        for start in range(0, len(misses), batch_size):
+            batch = misses[start:start + batch_size]
+            batch_paths = [pdf_paths[i] for i, _ in batch]
+            completion = self._parse(
+                lambda scale: self._batch_messages(batch_paths, use_first_page_only, detail, scale),
+                BatchDocumentExtractionResult,
+                f"a batch of {len(batch)} documents",
+            )
+            parsed = completion.choices[0].message.parsed
+            documents = parsed.documents if parsed is not None else []
+            if len(documents) != len(batch):
+                raise RuntimeError(
+                    f"Expected {len(batch)} extraction results, got {len(documents)}."
+                )
+
+            for (i, cache_key), result in zip(batch, documents):
+                results[i] = result
+                if cache_key is not None:
+                    self._store_cached(cache_key, result)
+
+        return results
+
 # ============================================================
 # CLI Usage
 # ============================================================
 if __name__ == "__main__":
     import sys
-    
+
     if len(sys.argv) < 2:
-        print("Usage: python document_classifier.py <pdf_path>")
+        print("Usage: python document_classifier.py <pdf_path> [<pdf_path> ...]")
         sys.exit(1)
 
-    pdf_path_arg = sys.argv[1]
-    
+    pdf_path_args = sys.argv[1:]
+
     # No assistant_id needed anymore
-    classifier = InvoicePOGRNClassifier()
-
-    try:
-        print(f"Processing {pdf_path_arg}...")
-        extraction = classifier.classify_pdf(pdf_path_arg)
-        
-        print("\n--- Document Type ---")
-        print(extraction.document_type.upper())
-        
-        print("\n--- Extracted Data (JSON) ---")
-        print(extraction.model_dump_json(indent=2))
-
-        # Save output
-        output_dir = Path("output")
-        output_dir.mkdir(exist_ok=True)
-        filename = Path(pdf_path_arg).stem + ".json"
-        with open(output_dir / filename, "w", encoding="utf-8") as f:
-            f.write(extraction.model_dump_json(indent=2))
-            
-    except Exception as e:
-        print(f"\nError: {e}")
\ No newline at end of file
+    classifier = InvoicePOGRNClassifier(cache_dir=DEFAULT_CACHE_DIR)
+
+    # Limit how many documents are rendered / in flight at once
+    MAX_CONCURRENT = 8
+
+    async def process(pdf_path_arg: str, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                print(f"Processing {pdf_path_arg}...")
+                extraction = await classifier.classify_pdf_async(pdf_path_arg)
+
+                print(f"\n--- Document Type ({pdf_path_arg}) ---")
+                print(extraction.document_type.upper())
+
+                print("\n--- Extracted Data (JSON) ---")
+                print(extraction.model_dump_json(indent=2))
+
+                # Save output
+                output_dir = Path("output")
+                output_dir.mkdir(exist_ok=True)
+                filename = Path(pdf_path_arg).stem + ".json"
+                with open(output_dir / filename, "w", encoding="utf-8") as f:
+                    f.write(extraction.model_dump_json(indent=2))
+
+            except Exception as e:
+                print(f"\nError ({pdf_path_arg}): {e}")
+
+    async def main() -> None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+        await asyncio.gather(*(process(p, semaphore) for p in pdf_path_args))
+
+    asyncio.run(main())
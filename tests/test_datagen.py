@@ -0,0 +1,99 @@
+"""Regression tests for the PDF builders in data/datagen.py."""
+
+import datetime
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+sys.path.insert(0, str(DATA_DIR))
+
+import datagen  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _in_data_dir(monkeypatch):
+    # The Japanese font is looked up relative to the working directory
+    monkeypatch.chdir(DATA_DIR)
+
+
+def _po_context(vendor, n_items):
+    items = [
+        {
+            "sku": item.sku,
+            "desc": item.desc,
+            "qty": 1,
+            "unit_price": 100,
+            "total": 100,
+            "currency": vendor.currency,
+            "tax_rate": 0.1,
+        }
+        for item in (vendor.items[i % len(vendor.items)] for i in range(n_items))
+    ]
+    return {
+        "po_num": "PO-10000",
+        "date": datetime.date(2024, 1, 1),
+        "currency": vendor.currency,
+        "vendor": vendor,
+        "buyer": datagen.BUYERS[0],
+        "items": items,
+        "subtotal": 100 * n_items,
+        "tax": 10 * n_items,
+        "tax_rate": 0.1,
+        "grand_total": 110 * n_items,
+    }
+
+
+def _inv_context(vendor, n_items):
+    context = _po_context(vendor, n_items)
+    buyer = context["buyer"]
+    context.update({
+        "inv_num": "INV-100000",
+        "ref_po": context.pop("po_num"),
+        "buyer_country": buyer.country,
+        "buyer_currency": buyer.currency,
+        "note": "",
+    })
+    return context
+
+
+def _grn_context(vendor, n_items):
+    return {
+        "grn_num": "GR-10000",
+        "date": datetime.date(2024, 1, 1),
+        "ref_po": "PO-10000",
+        "vendor": vendor,
+        "buyer": datagen.BUYERS[0],
+        "items": [
+            {"sku": "SKU", "desc": "Received item", "qty": 1, "status": "Accepted"}
+            for _ in range(n_items)
+        ],
+    }
+
+
+def _page_count(path):
+    return len(re.findall(rb"/Type /Page\b", path.read_bytes()))
+
+
+@pytest.mark.parametrize("doc_type, make_context", [
+    ("PO", _po_context),
+    ("INV", _inv_context),
+    ("GRN", _grn_context),
+])
+@pytest.mark.parametrize("vendor", datagen.VENDORS, ids=lambda v: v.country)
+def test_one_page_document_builds_after_multi_page_document(tmp_path, doc_type, make_context, vendor):
+    # A multi-page build leaves reportlab's _postponed mark on any flowable it
+    # pushed to the next page; flowables shared between builds would then
+    # fail the next document with "LayoutError: ... too large". Sweeping the
+    # item count moves the page break across every flowable in the layout.
+    long_pdf = tmp_path / "long.pdf"
+    short_pdf = tmp_path / "short.pdf"
+    saw_multi_page = False
+    for n_items in range(10, 45):
+        datagen.generate_pdf(str(long_pdf), make_context(vendor, n_items), doc_type)
+        saw_multi_page = saw_multi_page or _page_count(long_pdf) > 1
+        datagen.generate_pdf(str(short_pdf), make_context(vendor, 1), doc_type)
+        assert _page_count(short_pdf) == 1
+    assert saw_multi_page